@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursekernels.programming@arne.cl>
+
+"""
+Approximate tree kernels, which only count the tree fragments rooted at a
+selected subset of productions, cf. Rieck et al. (2010). Approximate Tree
+Kernels. Journal of Machine Learning Research 11.
+"""
+
+from collections import Counter, defaultdict, namedtuple
+import math
+import random
+import time
+
+from compact_tree import as_compact_trees, get_children_lists
+from tree import fast_tree_kernel, get_matching_node_pairs
+from tree_index import production_statistics
+
+
+ApproximationReport = namedtuple('ApproximationReport',
+                                 ['mean_absolute_error', 'mean_relative_error',
+                                  'max_relative_error', 'pair_ratio',
+                                  'speedup'])
+
+
+def approximate_tree_kernel(tree1, tree2, productions, node_attrib='label'):
+    """
+    calculates the tree kernel of Collins and Duffy (2001), but only counts
+    the fragments rooted at nodes with one of the given productions::
+
+        \sum_{p \in S} \sum_{n_1 \in N_1(p)} \sum_{n_2 \in N_2(p)} C(n_1, n_2)
+
+    C(n1, n2) is calculated as usual (i.e. the fragments rooted at a
+    selected production may contain any other productions), but only for
+    the node pairs that are reachable from a pair of selected nodes.
+
+    Parameters
+    ----------
+    tree1, tree2 : networkx.DiGraph or CompactTree
+        two trees represented as directed graphs (or as compact trees built
+        with the same vocabulary)
+    productions : set of int
+        the IDs of the selected productions (cf. select_productions())
+    node_attrib : str or None
+        If a node attribute is given (e.g. 'label'), its value is used for
+        generating the production rules. Otherwise, the node IDs are used.
+        (Only used for converting networkx.DiGraph trees.)
+
+    Returns
+    -------
+    kernel : int
+        the number of common tree fragments rooted at selected productions
+    """
+    tree1, tree2 = as_compact_trees([tree1, tree2], node_attrib=node_attrib)
+    productions1, productions2 = (tree1.productions.tolist(),
+                                  tree2.productions.tolist())
+    children1, children2 = get_children_lists(tree1), get_children_lists(tree2)
+
+    selected_nodes2 = defaultdict(list)
+    for n2, production in enumerate(productions2):
+        if production in productions:
+            selected_nodes2[production].append(n2)
+
+    common = {}  # memoized C(n1, n2) of all visited node pairs
+
+    def common_fragments(n1, n2):
+        if (n1, n2) not in common:
+            if productions1[n1] < 0 or productions1[n1] != productions2[n2]:
+                common[(n1, n2)] = 0
+            else:
+                result = 1  # neutral element of multiplication
+                for n1_child, n2_child in zip(children1[n1], children2[n2]):
+                    result *= 1 + common_fragments(n1_child, n2_child)
+                common[(n1, n2)] = result
+        return common[(n1, n2)]
+
+    kernel = 0
+    for n1, production in enumerate(productions1):
+        for n2 in selected_nodes2.get(production, ()):
+            kernel += common_fragments(n1, n2)
+    return kernel
+
+
+def select_productions(trees, ratio=0.1, labels=None, node_attrib='label'):
+    """
+    selects a subset of productions, s.t. approximate_tree_kernel() only
+    has to compare (roughly) the given ratio of the node pairs compared
+    by fast_tree_kernel().
+
+    Without labels, the productions that occur in the most trees are
+    selected first (frequency). Given class labels for the trees, the
+    productions with the highest information gain (w.r.t. the labels)
+    are selected first.
+
+    Parameters
+    ----------
+    trees : list of networkx.DiGraph or CompactTree
+        a (sample of the) corpus
+    ratio : float
+        the maximum ratio of node pair comparisons (0 < ratio <= 1)
+    labels : list or None
+        the class label of each tree
+    node_attrib : str or None
+        If a node attribute is given (e.g. 'label'), its value is used for
+        generating the production rules. Otherwise, the node IDs are used.
+        (Only used for converting networkx.DiGraph trees.)
+
+    Returns
+    -------
+    productions : set of int
+        the IDs of the selected productions
+    """
+    tree_statistics = [production_statistics(tree) for tree in
+                       as_compact_trees(trees, node_attrib=node_attrib)]
+    node_counts = Counter()
+    document_frequency = Counter()
+    for statistics in tree_statistics:
+        for production, (count, _dsum) in statistics.iteritems():
+            node_counts[production] += count
+            document_frequency[production] += 1
+
+    if labels is None:
+        scores = document_frequency
+    else:
+        scores = {production: information_gain(
+                      [production in statistics for statistics in tree_statistics],
+                      labels)
+                  for production in document_frequency}
+
+    # the number of node pairs with production p is proportional to the
+    # squared number of nodes with production p in the corpus
+    costs = {production: count**2 for production, count in node_counts.iteritems()}
+    budget = ratio * sum(costs.itervalues())
+    selected = set()
+    for production in sorted(scores, key=lambda p: (-scores[p], costs[p], p)):
+        if costs[production] <= budget:
+            selected.add(production)
+            budget -= costs[production]
+    return selected
+
+
+def information_gain(features, labels):
+    """
+    returns the information gain of a binary feature w.r.t. the class
+    labels, i.e. H(labels) - H(labels | feature).
+    """
+    def entropy(values):
+        counts = Counter(values)
+        return -sum(count / float(len(values)) *
+                    math.log(count / float(len(values)), 2)
+                    for count in counts.itervalues())
+
+    conditional_entropy = 0.0
+    for feature_value in (True, False):
+        subset = [label for feature, label in zip(features, labels)
+                  if feature == feature_value]
+        if subset:
+            conditional_entropy += \
+                len(subset) / float(len(labels)) * entropy(subset)
+    return entropy(labels) - conditional_entropy
+
+
+def approximation_error(trees, productions, num_of_samples=100, seed=None,
+                        node_attrib='label'):
+    """
+    compares approximate_tree_kernel() to fast_tree_kernel() on a random
+    sample of tree pairs.
+
+    Parameters
+    ----------
+    trees : list of networkx.DiGraph or CompactTree
+        the corpus (or a sample of it)
+    productions : set of int
+        the IDs of the selected productions (cf. select_productions())
+    num_of_samples : int
+        the number of tree pairs to compare
+    seed : int or None
+        seed of the random number generator used for sampling
+
+    Returns
+    -------
+    report : ApproximationReport
+        the mean absolute error, the mean and maximum relative error of the
+        approximate kernel values, the ratio of selected to all node pairs
+        with identical productions and the speedup (measured runtime of the
+        exact kernel divided by that of the approximate kernel)
+    """
+    trees = as_compact_trees(trees, node_attrib=node_attrib)
+    rng = random.Random(seed)
+    absolute_errors, relative_errors = [], []
+    selected_pairs, all_pairs = 0, 0
+    exact_time, approximate_time = 0.0, 0.0
+    for _ in xrange(num_of_samples):
+        tree1, tree2 = rng.choice(trees), rng.choice(trees)
+
+        start = time.time()
+        exact = fast_tree_kernel(tree1, tree2)
+        exact_time += time.time() - start
+        start = time.time()
+        approximate = approximate_tree_kernel(tree1, tree2, productions)
+        approximate_time += time.time() - start
+
+        absolute_errors.append(abs(exact - approximate))
+        relative_errors.append(abs(exact - approximate) / float(exact)
+                               if exact else 0.0)
+        node_pairs = get_matching_node_pairs(tree1, tree2)
+        all_pairs += len(node_pairs)
+        selected_pairs += sum(1 for n1, _n2 in node_pairs
+                              if tree1.productions[n1] in productions)
+
+    return ApproximationReport(
+        mean_absolute_error=sum(absolute_errors) / float(num_of_samples),
+        mean_relative_error=sum(relative_errors) / float(num_of_samples),
+        max_relative_error=max(relative_errors),
+        pair_ratio=selected_pairs / float(all_pairs) if all_pairs else 0.0,
+        speedup=exact_time / approximate_time if approximate_time else 1.0)
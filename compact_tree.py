@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursekernels.programming@arne.cl>
+
+"""
+A compact, immutable, array-backed representation of (syntax) trees for the
+tree kernels. Node labels and productions are interned into integer IDs,
+the children of all nodes are stored in one array (with per-node offsets)
+and the post-order of the nodes is precomputed.
+"""
+
+from collections import namedtuple
+
+from networkx import topological_sort
+
+from util import read_only_array
+
+
+class CompactTree(namedtuple('CompactTree', ['labels', 'child_offsets',
+                                               'children', 'postorder',
+                                               'productions', 'node_ids',
+                                               'vocabulary'])):
+    """
+    An immutable, array-backed tree with n nodes. Node 0 is the root node.
+
+    labels : numpy.ndarray
+        the interned label ID of each node
+    child_offsets : numpy.ndarray
+        n+1 offsets into ``children``, i.e. the children of node k are
+        ``children[child_offsets[k]:child_offsets[k+1]]``
+    children : numpy.ndarray
+        the (ordered) children of all nodes
+    postorder : numpy.ndarray
+        all nodes in post-order, i.e. each node comes after its children
+    productions : numpy.ndarray
+        the interned production ID of each node (-1 for leaf nodes)
+    node_ids : tuple or None
+        the original node ID of each node
+    vocabulary : TreeVocabulary
+        the vocabulary that the labels and productions were interned with
+    """
+    __slots__ = ()
+
+
+TreeVocabulary = namedtuple('TreeVocabulary', ['labels', 'productions'])
+
+# trees can only be compared if they were built with the same vocabulary,
+# so we use this one unless a vocabulary is given explicitly. It is never
+# cleared, i.e. it keeps every label and production (or node ID, if
+# node_attrib=None) interned in this process. Use your own TreeVocabulary
+# for large corpora, so that it can be freed once it isn't needed anymore.
+DEFAULT_VOCABULARY = TreeVocabulary(labels={}, productions={})
+
+
+def make_compact_tree(labels, children, node_ids=None, vocabulary=None):
+    """
+    builds a CompactTree from a list of node labels and a list of the
+    (ordered) children of each node. Node 0 must be the root node.
+
+    Parameters
+    ----------
+    labels : list
+        the label of each node
+    children : list of list of int
+        the indices of the children of each node
+    node_ids : tuple or None
+        the original node ID of each node
+    vocabulary : TreeVocabulary or None
+        used for interning labels and productions. If not given,
+        DEFAULT_VOCABULARY is used.
+
+    Returns
+    -------
+    compact_tree : CompactTree
+    """
+    if vocabulary is None:
+        vocabulary = DEFAULT_VOCABULARY
+    label_ids = [vocabulary.labels.setdefault(label, len(vocabulary.labels))
+                 for label in labels]
+
+    child_offsets = [0]
+    productions = []
+    for node, node_children in enumerate(children):
+        child_offsets.append(child_offsets[-1] + len(node_children))
+        if node_children:
+            production = (label_ids[node],
+                          tuple(label_ids[child] for child in node_children))
+            productions.append(vocabulary.productions.setdefault(
+                production, len(vocabulary.productions)))
+        else:
+            productions.append(-1)
+
+    postorder = []
+    if labels:
+        stack = [(0, False)]
+        while stack:
+            node, children_visited = stack.pop()
+            if children_visited:
+                postorder.append(node)
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children[node]))
+
+    return CompactTree(
+        labels=read_only_array(label_ids),
+        child_offsets=read_only_array(child_offsets),
+        children=read_only_array([child for node_children in children
+                                   for child in node_children]),
+        postorder=read_only_array(postorder),
+        productions=read_only_array(productions),
+        node_ids=node_ids,
+        vocabulary=vocabulary)
+
+
+def to_compact_tree(tree, node_attrib='label', vocabulary=None):
+    """
+    converts a tree represented as a networkx.DiGraph into a CompactTree.
+    The children of each node are ordered by their node IDs (just like in
+    tree.get_production_rules()).
+
+    Parameters
+    ----------
+    tree : networkx.DiGraph
+        a tree represented as a directed graph
+    node_attrib : str or None
+        If a node attribute is given (e.g. 'label'), its value is used as the
+        node label. Otherwise, the node IDs are used.
+    vocabulary : TreeVocabulary or None
+        used for interning labels and productions. If not given,
+        DEFAULT_VOCABULARY is used.
+    """
+    node_ids = []
+    if len(tree):
+        # the root node is the first element in a topological sort of the tree
+        stack = [topological_sort(tree)[0]]
+        while stack:  # pre-order traversal
+            node = stack.pop()
+            node_ids.append(node)
+            stack.extend(sorted(tree.successors(node), reverse=True))
+
+    node_index = {node: index for index, node in enumerate(node_ids)}
+    if node_attrib:
+        labels = [tree.node[node][node_attrib] for node in node_ids]
+    else:
+        labels = node_ids
+    children = [[node_index[child] for child in sorted(tree.successors(node))]
+                for node in node_ids]
+    return make_compact_tree(labels, children, node_ids=tuple(node_ids),
+                             vocabulary=vocabulary)
+
+
+def as_compact_tree(tree, node_attrib='label', vocabulary=None):
+    """
+    returns the given tree as a CompactTree (converting it, if it is a
+    networkx.DiGraph).
+
+    Raises
+    ------
+    ValueError
+        if the given CompactTree was built with another vocabulary than the
+        given one
+    """
+    if isinstance(tree, CompactTree):
+        if vocabulary is not None and tree.vocabulary is not vocabulary:
+            raise ValueError(
+                "The CompactTree was built with a different vocabulary")
+        return tree
+    return to_compact_tree(tree, node_attrib=node_attrib, vocabulary=vocabulary)
+
+
+def as_compact_trees(trees, node_attrib='label', vocabulary=None):
+    """
+    returns the given trees as CompactTrees that share the same vocabulary.
+    Unless a vocabulary is given, the networkx.DiGraphs are converted with
+    the vocabulary of the first CompactTree (or with DEFAULT_VOCABULARY, if
+    there is none).
+
+    Raises
+    ------
+    ValueError
+        if the given CompactTrees were built with different vocabularies
+    """
+    trees = list(trees)
+    if vocabulary is None:
+        vocabulary = next((tree.vocabulary for tree in trees
+                           if isinstance(tree, CompactTree)),
+                          DEFAULT_VOCABULARY)
+    return [as_compact_tree(tree, node_attrib=node_attrib,
+                            vocabulary=vocabulary)
+            for tree in trees]
+
+
+def get_children(compact_tree, node):
+    """returns the children of the given node of a CompactTree."""
+    return compact_tree.children[compact_tree.child_offsets[node]:
+                                 compact_tree.child_offsets[node+1]]
+
+
+def get_children_lists(compact_tree):
+    """
+    returns the children of all nodes of a CompactTree as a list of lists
+    (which is faster to index than the arrays in a Python loop).
+    """
+    children = compact_tree.children.tolist()
+    offsets = compact_tree.child_offsets.tolist()
+    return [children[offsets[node]:offsets[node+1]]
+            for node in xrange(len(offsets)-1)]
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursekernels.programming@arne.cl>
+
+"""
+A streaming reader for dependency parses in the CoNLL-X and CoNLL-U formats.
+Each sentence is converted into a CompactDependencyGraph (i.e. a few integer
+arrays) instead of a networkx graph, so that large parsed corpora can be
+fed into the dependency kernels.
+"""
+
+from collections import namedtuple
+
+from util import open_corpus, read_only_array
+
+
+class CompactDependencyGraph(namedtuple('CompactDependencyGraph',
+                                        ['words', 'heads', 'relations',
+                                         'vocabulary'])):
+    """
+    An immutable, array-backed dependency graph with n nodes. Node 0 is the
+    artificial root node (labelled '*'), node k is the k-th token.
+
+    words : numpy.ndarray
+        the interned word ID of each node
+    heads : numpy.ndarray
+        the head of each node (-1 for the root node)
+    relations : numpy.ndarray
+        the interned ID of the dependency relation between each node and
+        its head (-1 for the root node)
+    vocabulary : DependencyVocabulary
+        the vocabulary that the words and relations were interned with
+    """
+    __slots__ = ()
+
+
+DependencyVocabulary = namedtuple('DependencyVocabulary', ['words', 'relations'])
+
+# shared by all readers that aren't given a vocabulary
+DEFAULT_VOCABULARY = DependencyVocabulary(words={}, relations={})
+
+ROOT_LABEL = '*'
+
+# column indices of the CoNLL-X / CoNLL-U formats
+ID_COLUMN, FORM_COLUMN, HEAD_COLUMN, DEPREL_COLUMN = 0, 1, 6, 7
+
+
+def make_dependency_graph(words, heads, relations, vocabulary=None):
+    """
+    builds a CompactDependencyGraph from the words of a sentence, their
+    heads (1-based token indices, 0 for the root) and dependency relations.
+
+    Parameters
+    ----------
+    words : list of str
+        the tokens of the sentence
+    heads : list of int
+        the head of each token
+    relations : list of str
+        the dependency relation of each token
+    vocabulary : DependencyVocabulary or None
+        used for interning words and relations. If not given,
+        DEFAULT_VOCABULARY is used.
+    """
+    if vocabulary is None:
+        vocabulary = DEFAULT_VOCABULARY
+    word_ids = [vocabulary.words.setdefault(word, len(vocabulary.words))
+                for word in [ROOT_LABEL] + list(words)]
+    relation_ids = [-1] + [
+        vocabulary.relations.setdefault(relation, len(vocabulary.relations))
+        for relation in relations]
+    return CompactDependencyGraph(words=read_only_array(word_ids),
+                                  heads=read_only_array([-1] + list(heads)),
+                                  relations=read_only_array(relation_ids),
+                                  vocabulary=vocabulary)
+
+
+def read_conll(lines, vocabulary=None):
+    """
+    parses dependency graphs from the lines of a CoNLL-X or CoNLL-U file.
+    Sentences are separated by empty lines. Comments, multiword tokens and
+    empty nodes (CoNLL-U) are ignored.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        the lines of a CoNLL file
+    vocabulary : DependencyVocabulary or None
+        used for interning words and relations. If not given,
+        DEFAULT_VOCABULARY is used.
+
+    Yields
+    ------
+    graph : CompactDependencyGraph
+        one sentence after the other
+    """
+    words, heads, relations = [], [], []
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            if words:
+                yield make_dependency_graph(words, heads, relations,
+                                            vocabulary=vocabulary)
+                words, heads, relations = [], [], []
+            continue
+        if line.startswith('#'):
+            continue
+
+        columns = line.split('\t')
+        token_id = columns[ID_COLUMN]
+        if '-' in token_id or '.' in token_id:
+            continue  # multiword token or empty node
+        if len(columns) <= DEPREL_COLUMN or int(token_id) != len(words) + 1:
+            raise ValueError(
+                "Malformed CoNLL token in line {}: {}".format(line_number, line))
+        words.append(columns[FORM_COLUMN])
+        heads.append(int(columns[HEAD_COLUMN]))
+        relations.append(columns[DEPREL_COLUMN])
+    if words:
+        yield make_dependency_graph(words, heads, relations,
+                                    vocabulary=vocabulary)
+
+
+def read_conll_file(path, vocabulary=None):
+    """
+    reads all dependency graphs from a (plain, .gz or .bz2 compressed)
+    CoNLL-X or CoNLL-U file (cf. read_conll()).
+    """
+    with open_corpus(path) as conll_file:
+        for graph in read_conll(conll_file, vocabulary=vocabulary):
+            yield graph
@@ -2,14 +2,22 @@
 # -*- coding: utf-8 -*-
 # Author: Arne Neumann <discoursekernels.programming@arne.cl>
 
+import hashlib
 import itertools
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 
 import networkx as nx
 from networkx.algorithms import isomorphism as iso
 
 from discoursegraphs.util import ensure_utf8
 
+from conll import CompactDependencyGraph
+from util import escape_label
+
+
+# prefix of the (non-exact) signatures of subgraphs that aren't trees
+DAG_SIGNATURE_PREFIX = u'DAG:'
+
 
 def dependency_children(dependency_graph, node, edge_attrib='label'):
     """
@@ -118,6 +126,215 @@ def count_common_subgraphs(graph1, graph2, n1, n2,
         return result - 1
 
 
+DependencyIndex = namedtuple('DependencyIndex', ['order', 'labels',
+                                                 'children', 'label_buckets',
+                                                 'vocabulary'])
+
+
+def get_dependency_index(graph, node_attrib='label', edge_attrib='label'):
+    """
+    validates a dependency graph (once) and precomputes everything that
+    the dependency kernel needs to know about its nodes.
+
+    Parameters
+    ----------
+    graph : networkx.DiGraph
+        a dependency graph
+
+    Returns
+    -------
+    index : DependencyIndex
+        a (order, labels, children, label_buckets, vocabulary) named tuple.
+        ``order`` lists all nodes in reverse topological order (i.e. each
+        node comes after its dependents), ``labels`` maps each node to its
+        label, ``children`` maps each node to a dict, which maps
+        (relation, target node label) tuples to the list of target nodes,
+        ``label_buckets`` maps each label to the list of nodes with this
+        label that have at least one child and ``vocabulary`` is None (as
+        the nodes are labelled with strings instead of IDs).
+    """
+    assert nx.is_directed_acyclic_graph(graph)
+    labels = {node: graph.node[node][node_attrib] for node in graph.nodes_iter()}
+    children = {}
+    for node in graph.nodes_iter():
+        node_children = defaultdict(list)
+        for _source, target, edge_attrs in graph.out_edges(node, data=True):
+            node_children[(edge_attrs[edge_attrib], labels[target])].append(target)
+        children[node] = dict(node_children)
+    order = nx.topological_sort(graph)[::-1]
+    label_buckets = defaultdict(list)
+    for node in order:
+        if children[node]:
+            label_buckets[labels[node]].append(node)
+    return DependencyIndex(order, labels, children, dict(label_buckets), None)
+
+
+def get_compact_dependency_index(graph):
+    """
+    builds the DependencyIndex of a CompactDependencyGraph (e.g. read from
+    a CoNLL file). Nodes are labelled with their word IDs and relations
+    are represented by their IDs, so it can only be compared to the indexes
+    of graphs built with the same vocabulary.
+    """
+    words, heads = graph.words.tolist(), graph.heads.tolist()
+    relations = graph.relations.tolist()
+    labels = dict(enumerate(words))
+    children = {node: defaultdict(list) for node in xrange(len(heads))}
+    for node, head in enumerate(heads):
+        if head >= 0:
+            assert head < len(heads), "Invalid head of node {}".format(node)
+            children[head][(relations[node], words[node])].append(node)
+
+    # in a tree, the reverse topological order is the order of decreasing depth
+    depths = [None] * len(heads)
+    for node in xrange(len(heads)):
+        path = []
+        while node >= 0 and depths[node] is None:
+            path.append(node)
+            node = heads[node]
+            assert len(path) <= len(heads), "The graph contains a cycle"
+        depth = depths[node] if node >= 0 else -1
+        for path_node in reversed(path):
+            depth += 1
+            depths[path_node] = depth
+    order = sorted(xrange(len(heads)), key=depths.__getitem__, reverse=True)
+
+    label_buckets = defaultdict(list)
+    for node in order:
+        if children[node]:
+            label_buckets[labels[node]].append(node)
+    children = {node: dict(node_children)
+                for node, node_children in children.iteritems()}
+    return DependencyIndex(order, labels, children, dict(label_buckets),
+                           graph.vocabulary)
+
+
+def as_dependency_index(graph, node_attrib='label', edge_attrib='label'):
+    """
+    returns the given graph as a DependencyIndex (building one, if it is
+    a networkx.DiGraph or a CompactDependencyGraph).
+    """
+    if isinstance(graph, DependencyIndex):
+        return graph
+    elif isinstance(graph, CompactDependencyGraph):
+        return get_compact_dependency_index(graph)
+    return get_dependency_index(graph, node_attrib=node_attrib,
+                                edge_attrib=edge_attrib)
+
+
+def _check_vocabularies(index1, index2):
+    """
+    raises a ValueError, unless both DependencyIndexes were built from
+    networkx.DiGraphs or from CompactDependencyGraphs with the same
+    vocabulary (otherwise, their labels could never match).
+    """
+    if index1.vocabulary is not index2.vocabulary:
+        raise ValueError(
+            "Can't compare a CompactDependencyGraph to a networkx.DiGraph or "
+            "to a CompactDependencyGraph built with another vocabulary")
+
+
+def common_subgraph_counts(graph1, graph2, node_attrib='label',
+                           edge_attrib='label'):
+    """
+    calculates Cm(n1, n2) (cf. count_common_subgraphs()) for all node pairs
+    of two dependency graphs with dynamic programming. The nodes of the
+    first graph are processed in reverse topological order, so that the
+    Cm values of all dependent node pairs are already known::
+
+        Cm(n_1, n_2) = \prod_{(t_1, t_2)} (Cm(t_1, t_2) + 2) - 1
+
+    where (t1, t2) are the common dependency targets of n1 and n2
+    (i.e. targets with the same relation and the same label).
+
+    Cm(n1, n2) can only be non-zero if n1 and n2 have the same label and
+    at least one child each, so each node of the first graph is only
+    compared to the nodes in the matching label bucket of the second graph.
+
+    Parameters
+    ----------
+    graph1, graph2 : networkx.DiGraph or CompactDependencyGraph or DependencyIndex
+        two dependency graphs (or their precomputed indexes)
+
+    Returns
+    -------
+    counts : dict
+        maps (n1, n2) node pairs to their (non-zero) Cm value
+    """
+    index1 = as_dependency_index(graph1, node_attrib=node_attrib,
+                                 edge_attrib=edge_attrib)
+    index2 = as_dependency_index(graph2, node_attrib=node_attrib,
+                                 edge_attrib=edge_attrib)
+    _check_vocabularies(index1, index2)
+    counts = {}
+    for n1 in index1.order:
+        n1_children = index1.children[n1]
+        if not n1_children:
+            continue
+        for n2 in index2.label_buckets.get(index1.labels[n1], ()):
+            n2_children = index2.children[n2]
+            result = 1  # neutral element of multiplication
+            for target_key, n1_targets in n1_children.iteritems():
+                for n2_target in n2_children.get(target_key, ()):
+                    for n1_target in n1_targets:
+                        result *= counts.get((n1_target, n2_target), 0) + 2
+            if result > 1:
+                counts[(n1, n2)] = result - 1
+    return counts
+
+
+def dependency_kernel(graph1, graph2, node_attrib='label', edge_attrib='label'):
+    """
+    calculates the dependency kernel of Collins and Duffy (2001), i.e. the
+    sum of Cm(n1, n2) over all node pairs of the two graphs.
+
+    Parameters
+    ----------
+    graph1, graph2 : networkx.DiGraph or CompactDependencyGraph or DependencyIndex
+        two dependency graphs (or their precomputed indexes)
+
+    Returns
+    -------
+    kernel : int
+    """
+    return sum(common_subgraph_counts(graph1, graph2, node_attrib=node_attrib,
+                                      edge_attrib=edge_attrib).itervalues())
+
+
+def dependency_kernels(query_graph, graphs, node_attrib='label',
+                       edge_attrib='label'):
+    """
+    calculates the dependency kernel (cf. dependency_kernel()) of one query
+    graph and each of the given graphs. The query graph is only indexed
+    once and graphs that don't share a label with it are skipped.
+
+    Parameters
+    ----------
+    query_graph : networkx.DiGraph or CompactDependencyGraph or DependencyIndex
+        a dependency graph (or its precomputed index)
+    graphs : iterable of networkx.DiGraph or CompactDependencyGraph or DependencyIndex
+        dependency graphs (or their precomputed indexes, e.g. if the same
+        graphs will be queried repeatedly)
+
+    Returns
+    -------
+    kernels : list of int
+        the kernel value of the query graph and each graph
+    """
+    query_index = as_dependency_index(query_graph, node_attrib=node_attrib,
+                                      edge_attrib=edge_attrib)
+    kernels = []
+    for graph in graphs:
+        index = as_dependency_index(graph, node_attrib=node_attrib,
+                                    edge_attrib=edge_attrib)
+        _check_vocabularies(query_index, index)
+        if query_index.label_buckets.viewkeys() & index.label_buckets.viewkeys():
+            kernels.append(dependency_kernel(query_index, index))
+        else:
+            kernels.append(0)
+    return kernels
+
+
 def get_dependency_rules(graph, root_node=None,
                          node_attrib='label', edge_attrib='label'):
     """
@@ -198,23 +415,171 @@ def get_dependency_subgraphs(graph, node_attrib='label', edge_attrib='label'):
                 yield subgraph_candidate
 
 
+def get_dependency_fragments(graph, root_node=None, max_size=None):
+    """
+    generates all rooted, connected (dependency parse) subgraphs with at
+    least two nodes, i.e. the same subgraphs as get_dependency_subgraphs()
+    (for dependency trees), but without testing all node combinations.
+
+    The subgraphs are grown from their root (head) node: we keep a frontier
+    of the dependents of the nodes added so far and, for its first node,
+    either add it (extending the frontier by its dependents) or exclude it
+    from all subgraphs grown from here on. Therefore, each subgraph is
+    generated exactly once.
+
+    Parameters
+    ----------
+    graph : networkx.DiGraph
+        a dependency graph
+    root_node : str or int or None
+        If given, only the subgraphs rooted at this node are generated.
+        Otherwise, the subgraphs rooted at all nodes are generated.
+    max_size : int or None
+        the maximum number of nodes of a subgraph
+
+    Yields
+    ------
+    subgraphs : generator of networkx.DiGraph
+    """
+    assert nx.is_directed_acyclic_graph(graph)
+    root_nodes = graph.nodes() if root_node is None else [root_node]
+    for root in root_nodes:
+        frontier = sorted(graph.successors(root))
+        for nodes in _grow_dependency_fragments(graph, [root], frontier,
+                                                frozenset(), max_size):
+            if len(nodes) > 1:
+                yield graph.subgraph(nodes)
+
+
+def _grow_dependency_fragments(graph, nodes, frontier, excluded, max_size):
+    """
+    yields the node lists of all subgraphs that contain the given nodes and
+    any of the nodes that can be reached via the frontier (but none of the
+    excluded nodes).
+    """
+    if not frontier or (max_size is not None and len(nodes) >= max_size):
+        yield nodes
+        return
+
+    node, other_frontier = frontier[0], frontier[1:]
+    dependents = [dependent for dependent in sorted(graph.successors(node))
+                  if dependent not in excluded and dependent not in nodes
+                  and dependent not in other_frontier]
+    for subgraph_nodes in _grow_dependency_fragments(
+            graph, nodes + [node], other_frontier + dependents, excluded,
+            max_size):
+        yield subgraph_nodes
+    for subgraph_nodes in _grow_dependency_fragments(
+            graph, nodes, other_frontier, excluded | frozenset([node]),
+            max_size):
+        yield subgraph_nodes
+
+
 def generate_all_unique_dependency_subgraphs(graphs, node_attrib='label',
                                              edge_attrib='label'):
+    unique_subgraphs, _frequencies = dependency_subgraph_frequencies(
+        graphs, node_attrib=node_attrib, edge_attrib=edge_attrib)
+    return unique_subgraphs
+
+
+def dependency_subgraph_frequencies(graphs, max_size=None, node_attrib='label',
+                                    edge_attrib='label'):
+    """
+    collects the unique (dependency parse) subgraphs of a corpus and counts
+    the number of graphs each of them occurs in. The graphs are processed
+    one at a time and each subgraph is looked up in a hash table by its
+    dependency_fragment_signature(), so that isomorphism tests are only
+    needed for non-tree subgraphs with the same signature.
+
+    Parameters
+    ----------
+    graphs : iterable of networkx.DiGraph
+        dependency graphs
+    max_size : int or None
+        the maximum number of nodes of a subgraph
+
+    Returns
+    -------
+    unique_subgraphs : list of networkx.DiGraph
+        one subgraph for each group of isomorphic subgraphs (with the same
+        node and edge labels)
+    frequencies : list of int
+        the number of graphs that contain each unique subgraph
+    """
     same_node_label = iso.categorical_node_match(node_attrib, '')
     same_edge_label = iso.categorical_edge_match(edge_attrib, '')
-    if len(graphs) == 0:
-        return []
-    elif len(graphs) == 1:
-        return list(get_dependency_subgraphs(graphs[0], node_attrib=node_attrib))
-    else:
-        unique_subgraphs = list(get_dependency_subgraphs(
-            graphs[0], node_attrib=node_attrib, edge_attrib=edge_attrib))
-        for graph in graphs[1:]:
-            for subgraph in get_dependency_subgraphs(graph):
-                sg_combs = itertools.product([subgraph], unique_subgraphs)
-                if not any(nx.is_isomorphic(new_sg, old_sg,
-                                            node_match=same_node_label,
-                                            edge_match=same_edge_label)
-                           for new_sg, old_sg in sg_combs):
-                    unique_subgraphs.append(subgraph)
-        return unique_subgraphs
+    buckets = {}  # maps signatures to the IDs of their unique subgraphs
+    unique_subgraphs, frequencies = [], []
+    for graph in graphs:
+        subgraph_ids = set()
+        for subgraph in get_dependency_fragments(graph, max_size=max_size):
+            signature = dependency_fragment_signature(
+                subgraph, node_attrib=node_attrib, edge_attrib=edge_attrib)
+            bucket = buckets.setdefault(signature, [])
+            # tree signatures are exact, other signatures may collide
+            is_exact = not signature.startswith(DAG_SIGNATURE_PREFIX)
+            for subgraph_id in bucket:
+                if is_exact or nx.is_isomorphic(
+                        subgraph, unique_subgraphs[subgraph_id],
+                        node_match=same_node_label, edge_match=same_edge_label):
+                    break
+            else:  # no isomorphic subgraph has been seen before
+                subgraph_id = len(unique_subgraphs)
+                bucket.append(subgraph_id)
+                unique_subgraphs.append(subgraph)
+                frequencies.append(0)
+            subgraph_ids.add(subgraph_id)
+        for subgraph_id in subgraph_ids:
+            frequencies[subgraph_id] += 1
+    return unique_subgraphs, frequencies
+
+
+def dependency_fragment_signature(fragment, node_attrib='label',
+                                  edge_attrib='label'):
+    """
+    returns a canonical string representation of a (dependency parse)
+    subgraph. If the subgraph is a tree, its signature is exact, i.e. two
+    trees have the same signature, iff they are isomorphic (incl. node and
+    edge labels). The signature of a node (Aho, Hopcroft and Ullman 1974)
+    consists of its label and the (sorted) signatures of its dependents,
+    e.g. ``(saw (obj woman) (sbj (man (dt the))))``.
+
+    Other subgraphs get a Weisfeiler-Lehman style hash (prefixed with
+    DAG_SIGNATURE_PREFIX), which is the same for isomorphic subgraphs, but
+    may also be the same for non-isomorphic ones.
+    """
+    if nx.is_arborescence(fragment):
+        signatures = {}
+        for node in nx.dfs_postorder_nodes(fragment):
+            label = escape_label(fragment.node[node][node_attrib])
+            dependents = sorted(
+                u'({} {})'.format(escape_label(fragment[node][target][edge_attrib]),
+                                  signatures[target])
+                for target in fragment.successors(node))
+            if dependents:
+                signatures[node] = u'({} {})'.format(label, u' '.join(dependents))
+            else:
+                signatures[node] = label
+        # the root node is the first element in a topological sort of the graph
+        return signatures[nx.topological_sort(fragment)[0]]
+
+    labels = {node: escape_label(fragment.node[node][node_attrib])
+              for node in fragment.nodes_iter()}
+    for _ in xrange(len(labels)):
+        labels = {node: _hash_label(u'{} [{}] [{}]'.format(
+            labels[node],
+            u' '.join(sorted(u'{}:{}'.format(escape_label(edge_attrs[edge_attrib]),
+                                             labels[target])
+                             for _, target, edge_attrs in
+                             fragment.out_edges(node, data=True))),
+            u' '.join(sorted(u'{}:{}'.format(escape_label(edge_attrs[edge_attrib]),
+                                             labels[source])
+                             for source, _, edge_attrs in
+                             fragment.in_edges(node, data=True)))))
+                  for node in labels}
+    return DAG_SIGNATURE_PREFIX + _hash_label(u' '.join(sorted(labels.itervalues())))
+
+
+def _hash_label(label):
+    """compresses a (Weisfeiler-Lehman) node label into a short hash."""
+    return unicode(hashlib.md5(label.encode('utf-8')).hexdigest())
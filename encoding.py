@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursekernels.programming@arne.cl>
+
+"""
+Integer encoding of strings and token lists. Each document is interned into
+a numpy integer array once, so that the string kernels can compare integers
+instead of characters or token strings.
+"""
+
+import numpy
+from numpy.lib.stride_tricks import as_strided
+
+
+def encode(sequence, vocabulary):
+    """
+    encodes a string (or a list of tokens) as an array of integer symbol IDs.
+
+    Parameters
+    ----------
+    sequence : str or list of str
+        a string (to encode characters) or a list of tokens
+    vocabulary : dict
+        maps symbols to their IDs. Unknown symbols are added to it, so the
+        same vocabulary must be used for all documents that will be compared.
+
+    Returns
+    -------
+    encoded : numpy.ndarray
+        a one-dimensional array of symbol IDs
+    """
+    return numpy.fromiter(
+        (vocabulary.setdefault(symbol, len(vocabulary)) for symbol in sequence),
+        dtype=numpy.int32, count=len(sequence))
+
+
+def encode_corpus(corpus, vocabulary=None):
+    """
+    encodes all documents of a corpus with a shared vocabulary.
+
+    Returns
+    -------
+    encoded_corpus : list of numpy.ndarray
+        one array of symbol IDs per document
+    vocabulary : dict
+        maps symbols to their IDs
+    """
+    if vocabulary is None:
+        vocabulary = {}
+    return [encode(document, vocabulary) for document in corpus], vocabulary
+
+
+def decode(encoded, vocabulary):
+    """
+    converts an array of symbol IDs back into a list of symbols.
+    """
+    symbols = {symbol_id: symbol for symbol, symbol_id in vocabulary.iteritems()}
+    return [symbols[symbol_id] for symbol_id in encoded]
+
+
+def is_encoded(sequence):
+    """returns True, iff the given sequence is an array of symbol IDs."""
+    return isinstance(sequence, numpy.ndarray)
+
+
+def as_symbols(sequence):
+    """
+    returns an encoded sequence as a tuple of Python integers (which can be
+    compared faster than numpy scalars) and a token list as a tuple of
+    tokens, so that both can be used as cache keys. Strings are returned
+    unchanged.
+    """
+    if is_encoded(sequence):
+        return tuple(sequence.tolist())
+    elif isinstance(sequence, list):
+        return tuple(sequence)
+    return sequence
+
+
+def ngram_windows(encoded, n):
+    """
+    returns a read-only (len(encoded)-n+1, n) view of all n-grams of an
+    encoded sequence (i.e. row i is ``encoded[i:i+n]``), without copying it.
+    """
+    num_of_windows = max(len(encoded)-n+1, 0)
+    stride = encoded.strides[0]
+    windows = as_strided(encoded, shape=(num_of_windows, n),
+                         strides=(stride, stride))
+    windows.flags.writeable = False
+    return windows
+
+
+def pad_sequences(sequences, pad_value=-1):
+    """
+    stacks a batch of encoded sequences into a two-dimensional array,
+    filling up the shorter sequences with the given pad value (which must
+    not be a valid symbol ID).
+
+    Returns
+    -------
+    batch : numpy.ndarray
+        a (number of sequences, maximum sequence length) array
+    lengths : numpy.ndarray
+        the original length of each sequence
+    """
+    lengths = numpy.array([len(sequence) for sequence in sequences], dtype=int)
+    batch = numpy.full((len(sequences), lengths.max() if len(sequences) else 0),
+                       pad_value, dtype=numpy.int32)
+    for row, sequence in enumerate(sequences):
+        batch[row, :len(sequence)] = sequence
+    return batch, lengths
@@ -24,6 +24,6 @@ packages={'discoursekernels'},
 license='3-Clause BSD',
 dependency_link=['git+ssh://git+http://github.com/chebee7i/nxpd.git#egg=nxpd'],
 install_requires=[
-    'networkx', 'numpy', 'repoze.lru', 'ordered_set'
+    'networkx', 'numpy', 'scipy', 'repoze.lru', 'ordered_set'
 ],
 )
@@ -2,8 +2,15 @@
 # -*- coding: utf-8 -*-
 # Author: Arne Neumann <discoursekernels.programming@arne.cl>
 
-from collections import Counter
+from collections import Counter, deque
+import zlib
+
+import numpy
 from repoze.lru import lru_cache
+from scipy.sparse import csr_matrix
+
+from encoding import as_symbols, is_encoded, ngram_windows
+from suffix_automaton import suffix_automaton, matching_states, states_by_length
 
 """Naive implementations of a spectrum (string) kernels."""
 
@@ -24,13 +31,21 @@ def ngrams(text, n, pad=None):
     pad : str or None
         If the length of text is not evenly divisible by n, the final tuple is
         dropped if pad is not specified, or filled to length n by pad.
+        (Encoded input is padded with -1 instead.)
 
     Returns
     -------
     ngrams : list of tuples of str
     """
+    encoded = is_encoded(text)
+    text = as_symbols(text)
     if pad:
-        text += pad * n
+        if encoded:  # -1 is never a valid symbol ID
+            text += (-1,) * n
+        elif isinstance(text, tuple):  # a token list
+            text += tuple(pad * n)
+        else:
+            text += pad * n
         for i in xrange(0, len(text)-n):
             yield tuple(text[i:i+n])
     else:
@@ -100,10 +115,10 @@ def p_spectrum_kernel(s, t, p):
     ---------
     p : int
         length of contiguous substrings to be found
-    s : str
-        input string 1
-    t : str
-        input string 2
+    s : str or numpy.ndarray
+        input string 1 (or an encoded sequence, cf. encoding.encode())
+    t : str or numpy.ndarray
+        input string 2 (or an encoded sequence, cf. encoding.encode())
 
     Returns
     -------
@@ -111,9 +126,15 @@ def p_spectrum_kernel(s, t, p):
         returns the number of p-length contiguous substrings
         that both input strings have in common
     """
+    if is_encoded(s) and is_encoded(t):
+        # compare all p-length windows of t with each window of s at once
+        t_windows = ngram_windows(t, p)
+        return sum(int((t_windows == s_window).all(axis=1).sum())
+                   for s_window in ngram_windows(s, p))
+
     result = 0
     for i in xrange(len(s)-p+1):
-        for j in xrange(len(s)-p+1):
+        for j in xrange(len(t)-p+1):
             result += k_suffix_kernel(s[i:i+p], t[j:j+p], p)
     return result
 
@@ -137,6 +158,8 @@ def bruteforce_blended_spectrum_kernel(s, t, p):
     >>> bruteforce_blended_spectrum_kernel('abccc', 'abc', 2)
     7
     """
+    s, t = as_symbols(s), as_symbols(t)
+
     def delta(s, t):
         """identity function."""
         return 1 if s == t else 0
@@ -217,8 +240,280 @@ def blended_spectrum_kernel(s, t, p, lambda_weight=1):
     lambda_weight : int
        weight common suffixes according to their length
     """
+    s, t = as_symbols(s), as_symbols(t)
     result = 0
     for i in xrange(len(s)-p+1):
-        for j in xrange(len(s)-p+1):
+        for j in xrange(len(t)-p+1):
             result += p_suffix_kernel(s[i:i+p], t[j:j+p], p, lambda_weight)
     return result
+
+
+def p_spectrum_kernel_linear(s, t, p):
+    """
+    calculates the p-spectrum kernel of the strings s and t in
+    O(|s|+|t|) time, using a suffix automaton of s. This is a drop-in
+    replacement for p_spectrum_kernel().
+
+    For each position of t, we determine the longest suffix (of length <= p)
+    that also occurs in s. If that suffix has length p, we add the number of
+    its occurrences in s to the result.
+
+    Paramters
+    ---------
+    s : str or list of str
+        input string 1
+    t : str or list of str
+        input string 2
+    p : int
+        length of contiguous substrings to be found
+
+    Returns
+    -------
+    product : int
+        returns the number of p-length contiguous substrings
+        that both input strings have in common
+    """
+    if p < 1:
+        return 0
+    automaton = suffix_automaton(as_symbols(s))
+    counts = automaton.counts
+    result = 0
+    for state, matched in matching_states(automaton, as_symbols(t), p):
+        if matched == p:
+            result += counts[state]
+    return result
+
+
+def blended_spectrum_kernel_linear(s, t, p, lambda_weight=1):
+    """
+    calculates the blended spectrum kernel of the strings s and t in
+    O(|s|+|t|) time, using a suffix automaton of s::
+
+        \tilde{K_{p}} =
+            \sum\limits^{p}_{d=1} \lambda^{2d}
+            \sum\limits_{u \in \Sigma^{d}} \phi_{u}(s) \phi_{u}(t)
+
+        (Shawe-Taylor and Cristianini 2004, p.350f)
+
+    For lambda_weight=1, this returns the same results as
+    bruteforce_blended_spectrum_kernel().
+
+    Paramters
+    ---------
+    s : str or list of str
+        input string 1
+    t : str or list of str
+        input string 2
+    p : int
+        maximum length of contiguous substrings to be found
+    lambda_weight : int or float
+       weight common substrings according to their length
+    """
+    p = min(p, len(s))
+    if p < 1 or lambda_weight == 0:
+        return 0
+
+    # weights[d] is the summed weight of all common substrings of length 1..d
+    weights = [0]
+    for d in xrange(1, p+1):
+        weights.append(weights[-1] + lambda_weight**(2*d))
+
+    automaton = suffix_automaton(as_symbols(s))
+    length, link, _transitions, counts = automaton
+
+    # ancestor_weights[state] is the weighted number of occurrences of all
+    # substrings that are shorter than those represented by the state
+    ancestor_weights = [0] * len(length)
+    for state in states_by_length(length):
+        parent = link[state]
+        if parent > 0:
+            ancestor_weights[state] = ancestor_weights[parent] + \
+                counts[parent] * (weights[min(length[parent], p)] -
+                                  weights[min(length[link[parent]], p)])
+
+    result = 0
+    for state, matched in matching_states(automaton, as_symbols(t), p):
+        if matched == 0:
+            continue
+        result += ancestor_weights[state] + \
+            counts[state] * (weights[matched] - weights[length[link[state]]])
+    return result
+
+
+def spectrum_vectorize(corpus, p, lambda_weight=None, vocabulary=None):
+    """
+    maps a corpus of strings (or token lists) to a sparse matrix of their
+    explicit p-spectrum features, i.e. the inner product of two rows is the
+    p-spectrum kernel of the two corresponding documents.
+
+    If a lambda_weight is given, the rows contain the features of the
+    blended spectrum kernel instead, i.e. the counts of all n-grams of
+    length 1 <= d <= p, weighted by lambda_weight^d.
+
+    Parameters
+    ----------
+    corpus : iterable of str or iterable of list of str
+        the documents to vectorize
+    p : int
+        length of the contiguous substrings (maximum length for the blended
+        spectrum)
+    lambda_weight : int or float or None
+        If given, returns the blended spectrum features.
+    vocabulary : dict or None
+        maps n-gram tuples to column indices. If given, only the n-grams in
+        the vocabulary are used (e.g. to map new documents into the feature
+        space of a previously vectorized corpus). Otherwise, a new vocabulary
+        is built from the corpus.
+
+    Returns
+    -------
+    features : scipy.sparse.csr_matrix
+        a document x n-gram matrix
+    vocabulary : dict
+        maps n-gram tuples to column indices of the feature matrix
+    """
+    fixed_vocabulary = vocabulary is not None
+    if not fixed_vocabulary:
+        vocabulary = {}
+    ngram_lengths = range(1, p+1) if lambda_weight is not None else [p]
+
+    indptr, indices, data = [0], [], []
+    for document in corpus:
+        document_spectrum = Counter()
+        for n in ngram_lengths:
+            document_spectrum.update(ngrams(document, n))
+        for ngram, count in document_spectrum.iteritems():
+            if fixed_vocabulary:
+                column = vocabulary.get(ngram)
+                if column is None:
+                    continue
+            else:
+                column = vocabulary.setdefault(ngram, len(vocabulary))
+            indices.append(column)
+            if lambda_weight is None:
+                data.append(count)
+            else:
+                data.append(count * lambda_weight**len(ngram))
+        indptr.append(len(indices))
+
+    features = csr_matrix((data, indices, indptr),
+                          shape=(len(indptr)-1, len(vocabulary)))
+    return features, vocabulary
+
+
+def spectrum_gram_matrix(corpus, p, lambda_weight=None):
+    """
+    calculates the Gram matrix of the p-spectrum kernel (or the blended
+    spectrum kernel, if a lambda_weight is given) for all pairs of documents
+    in the corpus as a single sparse matrix product.
+
+    Returns
+    -------
+    gram_matrix : scipy.sparse.csr_matrix
+        a document x document matrix of kernel values
+    """
+    features, _vocabulary = spectrum_vectorize(corpus, p,
+                                               lambda_weight=lambda_weight)
+    return features.dot(features.T).tocsr()
+
+
+# parameters of the polynomial rolling hash used for hashed n-gram spectra
+HASH_MODULUS = 2**61 - 1  # a Mersenne prime
+HASH_BASE = 1000003
+
+
+def symbol_codes(chunks):
+    """
+    generates an integer code for each symbol of a text that is given as an
+    iterable of chunks. A chunk is either a string (whose characters are the
+    symbols), a list of tokens or an encoded sequence. The codes are stable across processes.
+    """
+    for chunk in chunks:
+        if is_encoded(chunk):
+            for symbol_id in chunk.tolist():
+                yield symbol_id
+        elif isinstance(chunk, basestring):
+            for char in chunk:
+                yield ord(char)
+        else:
+            for token in chunk:
+                if isinstance(token, unicode):
+                    token = token.encode('utf-8')
+                yield zlib.crc32(token) & 0xffffffff
+
+
+def hashed_ngrams(chunks, n, n_buckets):
+    """
+    generates the bucket IDs of all n-grams of a text (given as an iterable
+    of string or token list chunks, e.g. an open file) using a rolling hash.
+    n-grams that span several chunks are treated like any other n-gram, i.e.
+    the text never has to be held in memory as a whole.
+    """
+    base_power = pow(HASH_BASE, n-1, HASH_MODULUS)
+    window = deque()
+    ngram_hash = 0
+    for code in symbol_codes(chunks):
+        if len(window) == n:
+            ngram_hash = (ngram_hash - window.popleft() * base_power) \
+                % HASH_MODULUS
+        window.append(code)
+        ngram_hash = (ngram_hash * HASH_BASE + code) % HASH_MODULUS
+        if len(window) == n:
+            yield ngram_hash % n_buckets
+
+
+def hashed_spectrum(chunks, p, n_buckets=2**20, buffer_size=2**16):
+    """
+    calculates the p-spectrum of a text in a fixed amount of memory by
+    hashing its n-grams into n_buckets buckets (the 'hashing trick').
+    The inner product of two hashed spectra approximates (and, in the absence
+    of hash collisions, equals) their p-spectrum kernel.
+
+    Parameters
+    ----------
+    chunks : iterable of str or iterable of list of str
+        the text, split into chunks of characters or tokens
+    p : int
+        length of the contiguous substrings (n-grams)
+    n_buckets : int
+        size of the resulting feature vector
+    buffer_size : int
+        number of n-gram bucket IDs to collect before they are added to the
+        spectrum
+
+    Returns
+    -------
+    spectrum : numpy.ndarray
+        an array of n_buckets n-gram counts
+    """
+    spectrum = numpy.zeros(n_buckets, dtype=numpy.int64)
+    buffered_buckets = []
+    for bucket in hashed_ngrams(chunks, p, n_buckets):
+        buffered_buckets.append(bucket)
+        if len(buffered_buckets) == buffer_size:
+            numpy.add.at(spectrum, buffered_buckets, 1)
+            buffered_buckets = []
+    if buffered_buckets:
+        numpy.add.at(spectrum, buffered_buckets, 1)
+    return spectrum
+
+
+def hashed_spectrum_vectorize(documents, p, n_buckets=2**20):
+    """
+    maps a corpus to a sparse matrix of hashed p-spectrum features. Each
+    document is given as an iterable of chunks (cf. hashed_spectrum()), so
+    that neither the corpus nor any of its documents has to fit into memory.
+
+    Returns
+    -------
+    features : scipy.sparse.csr_matrix
+        a document x n_buckets matrix of hashed n-gram counts
+    """
+    indptr, indices, data = [0], [], []
+    for chunks in documents:
+        document_spectrum = Counter(hashed_ngrams(chunks, p, n_buckets))
+        indices.extend(document_spectrum.iterkeys())
+        data.extend(document_spectrum.itervalues())
+        indptr.append(len(indices))
+    return csr_matrix((data, indices, indptr),
+                      shape=(len(indptr)-1, n_buckets))
@@ -3,20 +3,43 @@
 # Author: Arne Neumann <discoursekernels.programming@arne.cl>
 
 from collections import defaultdict
+import math
 import numpy
 from repoze.lru import lru_cache
+from scipy.signal import lfilter
+
+from encoding import (as_symbols, encode, encode_corpus, is_encoded,
+                      pad_sequences)
 
 """Naive implementations of subsequence kernels"""
 
 
-@lru_cache(500)
+# number of results cached by the recursive kernels. Inputs that have more
+# (prefix of s, prefix of t) combinations than this are handed over to the
+# iterative implementations, which neither thrash the cache nor hit
+# Python's recursion limit.
+RECURSIVE_CACHE_SIZE = 500
+
+
 def all_subsequences_kernel_recursive(s, t):
     """
     counts the number of contiguous and non-contiguous subsequences
     that the input strings have in common (incl. the empty string).
 
     Shawe-Taylor and Cristianini (2004, p. 353f)
+
+    The input can be given as strings, token lists or encoded sequences
+    (cf. encoding.encode()). Large inputs are handled by
+    all_subsequences_kernel_iterative().
     """
+    s, t = as_symbols(s), as_symbols(t)
+    if (len(s)+1) * (len(t)+1) > RECURSIVE_CACHE_SIZE:
+        return all_subsequences_kernel_iterative(s, t)
+    return _all_subsequences_kernel_recursive(s, t)
+
+
+@lru_cache(RECURSIVE_CACHE_SIZE)
+def _all_subsequences_kernel_recursive(s, t):
     # if s or t are empty strings
     if not s or not t:
         return 1  # each string contains the empty string by definition
@@ -25,8 +48,32 @@ def all_subsequences_kernel_recursive(s, t):
         result = 0
         for k, _ti in enumerate(t):
             if t[k] == s_tail:
-                result += all_subsequences_kernel_recursive(s_head, t[:k])
-    return all_subsequences_kernel_recursive(s_head, t) + result
+                result += _all_subsequences_kernel_recursive(s_head, t[:k])
+    return _all_subsequences_kernel_recursive(s_head, t) + result
+
+
+def all_subsequences_kernel_iterative(s, t):
+    """
+    counts the number of contiguous and non-contiguous subsequences
+    that the input strings have in common (incl. the empty string).
+
+    This computes the same (exact, integer) result as
+    all_subsequences_kernel_recursive(), but fills its memo table
+    iteratively, one prefix of s at a time, in O(|s|*|t|) time. Only the
+    row of the previous prefix of s is kept in memory.
+    """
+    s, t = as_symbols(s), as_symbols(t)
+    # previous_row[j] is the kernel of the current prefix of s and t[:j]
+    previous_row = [1] * (len(t)+1)
+    for s_i in s:
+        row = [1]
+        matches = 0  # sum of previous_row[k] for all t[k] == s_i, k < j
+        for j, t_j in enumerate(t):
+            if t_j == s_i:
+                matches += previous_row[j]
+            row.append(previous_row[j+1] + matches)
+        previous_row = row
+    return previous_row[-1]
 
 
 def all_subsequences_kernel_dp1(s, t):
@@ -40,6 +87,7 @@ def all_subsequences_kernel_dp1(s, t):
 
     TODO: convert to zero-based numbering
     """
+    s, t = as_symbols(s), as_symbols(t)
     dp = numpy.zeros( (len(s)+1, len(t)+1) )
     for j, _tj in enumerate(t, 1):  # TODO: get rid of loop
         dp[0][j] = 1
@@ -57,11 +105,82 @@ def all_subsequences_kernel_dp1(s, t):
     return dp[len(s)][len(t)]
 
 
-@lru_cache(500)
+def all_subsequences_kernel_vectorized(s, t):
+    """
+    counts the number of non-contiguous subsequences that the input strings
+    have in common (incl. the empty string), using a vectorized version of
+    the dynamic programming approach of all_subsequences_kernel_dp1().
+
+    Each row of the DP matrix is computed from the previous one with a
+    cumulative sum over the positions of t that match the current symbol
+    of s, so we only need O(|t|) space::
+
+        DP(i, j) = DP(i-1, j) + \sum\limits_{k \leq j, t_k = s_i} DP(i-1, k-1)
+
+        Shawe-Taylor and Cristianini (2004, p. 356)
+
+    Parameters
+    ----------
+    s : str or list of str or numpy.ndarray
+        input string 1
+    t : str or list of str or numpy.ndarray
+        input string 2 (must be encoded, iff s is encoded)
+
+    Returns
+    -------
+    product : float
+        the number of common subsequences
+    """
+    t_ids, vocabulary = _encode_target(s, t)
+    match_masks = {}  # symbol of s -> positions of t where it occurs
+    row = numpy.ones(len(t)+1)
+    for s_i in as_symbols(s):
+        if s_i not in match_masks:
+            if vocabulary is None:
+                match_masks[s_i] = t_ids == s_i
+            else:
+                match_masks[s_i] = t_ids == vocabulary.get(s_i, -1)
+        row[1:] += numpy.cumsum(numpy.where(match_masks[s_i], row[:-1], 0))
+    return row[-1]
+
+
+def _encode_target(s, t):
+    """
+    returns t as an array of symbol IDs and the vocabulary it was encoded
+    with (None, if t was already encoded), so that the symbols of s can be
+    looked up in it.
+
+    Raises
+    ------
+    ValueError
+        if only one of the input sequences is encoded, as its symbol IDs
+        can't be compared to the symbols of the other one
+    """
+    if is_encoded(s) != is_encoded(t):
+        raise ValueError(
+            "Either both or none of the input sequences must be encoded")
+    if is_encoded(t):
+        return t, None
+    vocabulary = {}
+    return encode(t, vocabulary), vocabulary
+
+
 def fixed_length_subsequences_kernel_recursive(s, t, p):
     """
     Shawe-Taylor and Cristianini (2004, p. 358)
+
+    The input can be given as strings, token lists or encoded sequences
+    (cf. encoding.encode()). Large inputs are handled by
+    fixed_length_subsequences_kernel_iterative().
     """
+    s, t = as_symbols(s), as_symbols(t)
+    if (p+1) * (len(s)+1) * (len(t)+1) > RECURSIVE_CACHE_SIZE:
+        return fixed_length_subsequences_kernel_iterative(s, t, p)
+    return _fixed_length_subsequences_kernel_recursive(s, t, p)
+
+
+@lru_cache(RECURSIVE_CACHE_SIZE)
+def _fixed_length_subsequences_kernel_recursive(s, t, p):
     if p == 0:
         return 1
     elif not s or not t:
@@ -72,8 +191,37 @@ def fixed_length_subsequences_kernel_recursive(s, t, p):
         result = 0
         for j, t_j in enumerate(t):
             if t_j == s_tail:
-                result += fixed_length_subsequences_kernel_recursive(s_head, t[:j], p-1)
-        return fixed_length_subsequences_kernel_recursive(s_head, t, p) + result
+                result += _fixed_length_subsequences_kernel_recursive(s_head, t[:j], p-1)
+        return _fixed_length_subsequences_kernel_recursive(s_head, t, p) + result
+
+
+def fixed_length_subsequences_kernel_iterative(s, t, p):
+    """
+    counts the number of (contiguous and non-contiguous) subsequences of
+    length p that the input strings have in common.
+
+    This computes the same (exact, integer) result as
+    fixed_length_subsequences_kernel_recursive(), but fills its memo table
+    iteratively, one prefix of s at a time, in O(p*|s|*|t|) time. Only the
+    rows of the previous prefix of s (one per length 0 ... p) are kept in
+    memory.
+    """
+    s, t = as_symbols(s), as_symbols(t)
+    # previous_rows[l][j] is the kernel (for length l) of the current prefix
+    # of s and t[:j]
+    previous_rows = [[1] * (len(t)+1)] + [[0] * (len(t)+1) for _ in xrange(p)]
+    for s_i in s:
+        rows = [previous_rows[0]]
+        for l in xrange(1, p+1):
+            row = [0]
+            matches = 0  # sum of previous_rows[l-1][k] for t[k] == s_i, k < j
+            for j, t_j in enumerate(t):
+                if t_j == s_i:
+                    matches += previous_rows[l-1][j]
+                row.append(previous_rows[l][j+1] + matches)
+            rows.append(row)
+        previous_rows = rows
+    return previous_rows[p][-1]
 
 
 def fixed_length_subsequences_kernel_dp1(s, t, p, debug=False):
@@ -82,6 +230,7 @@ def fixed_length_subsequences_kernel_dp1(s, t, p, debug=False):
 
     TODO: convert to zero-based numbering
     """
+    s, t = as_symbols(s), as_symbols(t)
     dp = numpy.ones( (len(s)+1, len(t)+1) )
     pre = numpy.zeros(len(t)+1)
 
@@ -102,6 +251,58 @@ def fixed_length_subsequences_kernel_dp1(s, t, p, debug=False):
     return dp[len(s)][len(t)]
 
 
+def fixed_length_subsequences_kernels(s, t, p, weights=None):
+    """
+    calculates the fixed length subsequences kernel for all lengths
+    1 ... p in one pass (cf. fixed_length_subsequences_kernel_dp1()).
+
+    The DP rows of all lengths are updated together: each row is computed
+    from the previous row of the same length and of the next shorter
+    length, with cumulative sums over the positions of t that match the
+    current symbol of s::
+
+        DP_l(i, j) = DP_l(i-1, j) +
+            \sum\limits_{k \leq j, t_k = s_i} DP_{l-1}(i-1, k-1)
+
+        Shawe-Taylor and Cristianini (2004, p. 358f)
+
+    Parameters
+    ----------
+    s : str or list of str or numpy.ndarray
+        input string 1
+    t : str or list of str or numpy.ndarray
+        input string 2 (must be encoded, iff s is encoded)
+    p : int
+        maximum length of the common subsequences
+    weights : array-like or None
+        If given, returns the blended kernel, i.e. the sum of the kernel
+        values of all lengths 1 ... p, weighted by weights[l-1].
+
+    Returns
+    -------
+    kernels : numpy.ndarray or float
+        an array of p kernel values (kernels[l-1] is the kernel for
+        length l) or their weighted sum, if weights are given.
+    """
+    t_ids, vocabulary = _encode_target(s, t)
+    rows = numpy.zeros( (p+1, len(t)+1) )
+    rows[0] = 1  # each string contains the empty string
+    match_masks = {}
+    for s_i in as_symbols(s):
+        if s_i not in match_masks:
+            if vocabulary is None:
+                match_masks[s_i] = t_ids == s_i
+            else:
+                match_masks[s_i] = t_ids == vocabulary.get(s_i, -1)
+        rows[1:, 1:] += numpy.cumsum(
+            numpy.where(match_masks[s_i], rows[:-1, :-1], 0), axis=1)
+
+    kernels = rows[1:, -1]
+    if weights is not None:
+        return numpy.dot(weights, kernels)
+    return kernels
+
+
 def gap_weighted_subsequences_kernel_recursive(s, t, p, lambda_weight):
     """
     Shawe-Taylor and Cristianini (2004, p. 364f).
@@ -109,6 +310,7 @@ def gap_weighted_subsequences_kernel_recursive(s, t, p, lambda_weight):
     TODO: fix recursion for p
     TODO: add tests
     """
+    s, t = as_symbols(s), as_symbols(t)
     delta = lambda x, y: 1 if x == y else 0  # identity function
     head = lambda x: x[:-1]
     tail = lambda x: x[-1] if x else ''  # last char or '' if empty
@@ -132,8 +334,17 @@ def gap_weighted_subsequences_kernel_dp1(s, t, p, lambda_weight):
     """
     Shawe-Taylor and Cristianini (2004, p. 369).
 
+    lambda_weight can also be an array of decay factors (e.g. for a
+    hyperparameter sweep). In that case, all DP cells carry an additional
+    lambda axis, so the kernel values for all lambdas are calculated in one
+    pass and returned as an array.
+
     TODO: add tests
     """
+    s, t = as_symbols(s), as_symbols(t)
+    if numpy.ndim(lambda_weight) > 0:
+        return _gap_weighted_subsequences_kernels_dp1(s, t, p, lambda_weight)
+
     dps = numpy.zeros( (len(s)+1, len(t)+1) )
     for i, s_i in enumerate(s, 1):
         for j, t_j in enumerate(t, 1):
@@ -153,3 +364,318 @@ def gap_weighted_subsequences_kernel_dp1(s, t, p, lambda_weight):
                     dps[i][j] = lambda_weight**2 * dp[i-1][j-1]
                     kern[l] += dps[i][j]
     return kern[p]
+
+
+def _gap_weighted_subsequences_kernels_dp1(s, t, p, lambda_weights):
+    """
+    gap_weighted_subsequences_kernel_dp1() for an array of decay factors.
+    All DP cells carry a trailing lambda axis.
+    """
+    lambdas = numpy.asarray(lambda_weights, dtype=float)
+    dp_shape = (len(s)+1, len(t)+1) + lambdas.shape
+
+    dps = numpy.zeros(dp_shape)
+    for i, s_i in enumerate(s, 1):
+        for j, t_j in enumerate(t, 1):
+            if s_i == t_j:
+                dps[i][j] = lambdas ** 2
+
+    dp = numpy.zeros(dp_shape)
+    kern = defaultdict(lambda: numpy.zeros(lambdas.shape))
+    for l in xrange(2, p+1):
+        kern[l] = numpy.zeros(lambdas.shape)
+        for i, s_i in enumerate(s, 1):
+            for j, t_j in enumerate(t, 1):
+                dp[i][j] = dps[i][j] + lambdas * dp[i-1][j] \
+                            + lambdas * dp[i, j-1] \
+                            - lambdas**2 *  dp[i-1][j-1]
+                if s_i == t_j:
+                    dps[i][j] = lambdas**2 * dp[i-1][j-1]
+                    kern[l] += dps[i][j]
+    return kern[p]
+
+
+def gap_weighted_subsequences_kernel_sparse(s, t, p, lambda_weight):
+    """
+    calculates the gap-weighted subsequences kernel (cf.
+    gap_weighted_subsequences_kernel_dp1()), but only visits the cells
+    (i, j) of the DP matrix where s_i == t_j. For token sequences, these
+    matches are only a tiny fraction of all |s| x |t| cells.
+
+    Runs in O(p * #matches * log|t|) time.
+
+    Parameters
+    ----------
+    s : str or list of str or numpy.ndarray
+        input string 1
+    t : str or list of str or numpy.ndarray
+        input string 2
+    p : int
+        length of the common subsequences
+    lambda_weight : float
+        decay factor that penalizes gaps (and the length of subsequences)
+
+    Returns
+    -------
+    product : float
+        the gap-weighted number of common subsequences of length p
+    """
+    if p < 1:
+        return 0.0
+    return _sparse_gap_weighted_kernels(s, t, p, lambda_weight)[-1]
+
+
+def _sparse_gap_weighted_kernels(s, t, p, lambda_weight):
+    """
+    returns the list of gap-weighted subsequences kernel values for all
+    lengths 1 ... p.
+
+    For each length l, the values DPS_l(i, j) of all matches (i, j) are
+    calculated from the DPS_{l-1} values of all matches (i', j') with
+    i' < i and j' < j::
+
+        DPS_l(i, j) = \lambda^2 \sum\limits_{i' < i, j' < j}
+            \lambda^{(i-1-i') + (j-1-j')} DPS_{l-1}(i', j')
+
+    We iterate over the matches row by row and store the DPS_{l-1} values
+    of the rows we've already seen in a Fenwick tree over j, whose nodes
+    hold sums that are decayed to the right end of their range. The decay
+    along i is applied lazily (relative to a reference row that is moved
+    forward before the stored values could overflow).
+    """
+    if p < 1:
+        return []
+    s, t = as_symbols(s), as_symbols(t)
+    lambda_weight = float(lambda_weight)
+
+    # index the positions of t by symbol and collect all matching cells
+    positions = defaultdict(list)
+    for j, t_j in enumerate(t, 1):
+        positions[t_j].append(j)
+    match_rows = [(i, positions[s_i]) for i, s_i in enumerate(s, 1)
+                  if s_i in positions]
+
+    if lambda_weight == 0 or not match_rows:
+        return [0.0] * p
+
+    num_of_columns = len(t)
+    powers = [lambda_weight**k for k in xrange(num_of_columns+1)]
+    if lambda_weight == 1:
+        max_row_gap = None
+    else:  # don't let lazily decayed values grow beyond 10^100
+        max_row_gap = max(int(100 * math.log(10) / abs(math.log(lambda_weight))), 1)
+
+    row_values = [[lambda_weight**2] * len(columns) for _i, columns in match_rows]
+    kernels = [sum(map(sum, row_values))]
+    for _l in xrange(2, p+1):
+        tree = [0.0] * (num_of_columns+1)
+        reference_row = match_rows[0][0]
+        next_row_values = []
+        for (i, columns), values in zip(match_rows, row_values):
+            if max_row_gap and i - reference_row > max_row_gap:
+                factor = lambda_weight ** (i - reference_row)
+                tree = [value * factor for value in tree]
+                reference_row = i
+
+            row_scale = lambda_weight**2 * lambda_weight ** (i-1 - reference_row)
+            next_values = []
+            for j in columns:
+                # decayed sum of all stored values in columns 1 ... j-1
+                prefix_sum, k = 0.0, j-1
+                while k > 0:
+                    prefix_sum += tree[k] * powers[j-1 - k]
+                    k -= k & -k
+                next_values.append(row_scale * prefix_sum)
+            next_row_values.append(next_values)
+
+            insertion_scale = lambda_weight ** (reference_row - i)
+            for j, value in zip(columns, values):
+                if value:
+                    value *= insertion_scale
+                    k = j
+                    while k <= num_of_columns:
+                        tree[k] += value * powers[k - j]
+                        k += k & -k
+        row_values = next_row_values
+        kernels.append(sum(map(sum, row_values)))
+    return kernels
+
+
+def gap_weighted_subsequences_kernels(s, t, p, lambda_weight, weights=None):
+    """
+    calculates the gap-weighted subsequences kernel for all lengths 1 ... p
+    in one pass (cf. gap_weighted_subsequences_kernel_sparse()).
+
+    Parameters
+    ----------
+    s : str or list of str or numpy.ndarray
+        input string 1
+    t : str or list of str or numpy.ndarray
+        input string 2
+    p : int
+        maximum length of the common subsequences
+    lambda_weight : float
+        decay factor that penalizes gaps (and the length of subsequences)
+    weights : array-like or None
+        If given, returns the blended kernel, i.e. the sum of the kernel
+        values of all lengths 1 ... p, weighted by weights[l-1].
+
+    Returns
+    -------
+    kernels : numpy.ndarray or float
+        an array of p kernel values (kernels[l-1] is the kernel for
+        length l) or their weighted sum, if weights are given.
+    """
+    kernels = numpy.array(_sparse_gap_weighted_kernels(s, t, p, lambda_weight))
+    if weights is not None:
+        return numpy.dot(weights, kernels)
+    return kernels
+
+
+def _padded_batches(s_batch, t_batch):
+    """
+    converts two equally long lists of sequences into padded arrays of
+    symbol IDs. Unless all sequences are already encoded, they are encoded
+    with a shared vocabulary. s and t are padded with different values, so
+    that padding never matches.
+    """
+    assert len(s_batch) == len(t_batch)
+    sequences = list(s_batch) + list(t_batch)
+    if not all(is_encoded(sequence) for sequence in sequences):
+        sequences, _vocabulary = encode_corpus(sequences)
+    s_padded, _s_lengths = pad_sequences(sequences[:len(s_batch)], pad_value=-1)
+    t_padded, t_lengths = pad_sequences(sequences[len(s_batch):], pad_value=-2)
+    return s_padded, t_padded, t_lengths
+
+
+def all_subsequences_kernel_batch(s_batch, t_batch):
+    """
+    calculates the all-subsequences kernel (cf.
+    all_subsequences_kernel_vectorized()) for many pairs of sequences at
+    once. The sequences are padded and the DP rows of all pairs are stacked
+    along a leading batch axis.
+
+    Parameters
+    ----------
+    s_batch : list of str or list of list of str or list of numpy.ndarray
+        the first sequence of each pair
+    t_batch : list of str or list of list of str or list of numpy.ndarray
+        the second sequence of each pair
+
+    Returns
+    -------
+    kernels : numpy.ndarray
+        the kernel value of each pair (s_batch[b], t_batch[b])
+    """
+    s_padded, t_padded, t_lengths = _padded_batches(s_batch, t_batch)
+    batch_size, t_max_length = t_padded.shape
+    rows = numpy.ones( (batch_size, t_max_length+1) )
+    for i in xrange(s_padded.shape[1]):
+        match_masks = t_padded == s_padded[:, i:i+1]
+        rows[:, 1:] += numpy.cumsum(
+            numpy.where(match_masks, rows[:, :-1], 0), axis=1)
+    return rows[numpy.arange(batch_size), t_lengths]
+
+
+def fixed_length_subsequences_kernel_batch(s_batch, t_batch, p):
+    """
+    calculates the fixed length subsequences kernel (cf.
+    fixed_length_subsequences_kernels()) for many pairs of sequences at
+    once.
+
+    Returns
+    -------
+    kernels : numpy.ndarray
+        the kernel value of each pair (s_batch[b], t_batch[b])
+    """
+    s_padded, t_padded, t_lengths = _padded_batches(s_batch, t_batch)
+    batch_size, t_max_length = t_padded.shape
+    rows = numpy.zeros( (batch_size, p+1, t_max_length+1) )
+    rows[:, 0] = 1  # each string contains the empty string
+    for i in xrange(s_padded.shape[1]):
+        match_masks = (t_padded == s_padded[:, i:i+1])[:, numpy.newaxis, :]
+        rows[:, 1:, 1:] += numpy.cumsum(
+            numpy.where(match_masks, rows[:, :-1, :-1], 0), axis=2)
+    return rows[numpy.arange(batch_size), p, t_lengths]
+
+
+def gap_weighted_subsequences_kernel_batch(s_batch, t_batch, p, lambda_weight):
+    """
+    calculates the gap-weighted subsequences kernel (cf.
+    gap_weighted_subsequences_kernel_dp1()) for many pairs of sequences at
+    once.
+
+    The DP matrices of all lengths 1 ... p are filled row by row, so we only
+    keep a (batch size, p, |t|+1) array of the previous row. The recursion
+    along each row is a first-order linear filter, which is applied to all
+    pairs and lengths at once::
+
+        DP_l(i, j) = DPS_{l-1}(i, j) + \lambda DP_l(i-1, j)
+                     - \lambda^2 DP_l(i-1, j-1) + \lambda DP_l(i, j-1)
+
+    Returns
+    -------
+    kernels : numpy.ndarray
+        the kernel value of each pair (s_batch[b], t_batch[b])
+    """
+    if p < 1:
+        return numpy.zeros(len(s_batch))
+    s_padded, t_padded, _t_lengths = _padded_batches(s_batch, t_batch)
+    batch_size, t_max_length = t_padded.shape
+    lambda_squared = lambda_weight ** 2
+
+    kernels = numpy.zeros( (batch_size, p) )
+    dps = numpy.zeros( (batch_size, p, t_max_length) )  # lengths 1 ... p
+    dp = numpy.zeros( (batch_size, p-1, t_max_length+1) )  # lengths 2 ... p
+    for i in xrange(s_padded.shape[1]):
+        match_masks = t_padded == s_padded[:, i:i+1]
+        dps[:, 0] = lambda_squared * match_masks
+        dps[:, 1:] = lambda_squared * dp[:, :, :-1] * match_masks[:, numpy.newaxis, :]
+        kernels += dps.sum(axis=2)
+
+        if p < 2:
+            continue
+        row_input = dps[:, :-1] + lambda_weight * dp[:, :, 1:] \
+            - lambda_squared * dp[:, :, :-1]
+        dp[:, :, 1:] = lfilter([1], [1, -lambda_weight], row_input, axis=2)
+    return kernels[:, p-1]
+
+
+def subsequences_gram_matrix(sequences, batch_kernel, batch_size=1024,
+                             **kernel_args):
+    """
+    calculates the Gram matrix of a subsequences kernel for all pairs of
+    the given sequences, evaluating batch_size pairs at once.
+
+    Parameters
+    ----------
+    sequences : list of str or list of list of str or list of numpy.ndarray
+        the sequences to compare
+    batch_kernel : function
+        one of all_subsequences_kernel_batch(),
+        fixed_length_subsequences_kernel_batch() or
+        gap_weighted_subsequences_kernel_batch()
+    batch_size : int
+        number of pairs that are evaluated at once
+    kernel_args : dict
+        additional arguments of the kernel (e.g. p, lambda_weight)
+
+    Returns
+    -------
+    gram_matrix : numpy.ndarray
+        a symmetric (number of sequences x number of sequences) matrix
+    """
+    encoded_sequences, _vocabulary = encode_corpus(
+        as_symbols(sequence) for sequence in sequences)
+    num_of_sequences = len(encoded_sequences)
+    rows, columns = numpy.triu_indices(num_of_sequences)
+    gram_matrix = numpy.zeros( (num_of_sequences, num_of_sequences) )
+    for start in xrange(0, len(rows), batch_size):
+        batch_rows = rows[start:start+batch_size]
+        batch_columns = columns[start:start+batch_size]
+        kernels = batch_kernel([encoded_sequences[i] for i in batch_rows],
+                               [encoded_sequences[j] for j in batch_columns],
+                               **kernel_args)
+        gram_matrix[batch_rows, batch_columns] = kernels
+        gram_matrix[batch_columns, batch_rows] = kernels
+    return gram_matrix
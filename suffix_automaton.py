@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursekernels.programming@arne.cl>
+
+"""
+A suffix automaton (directed acyclic word graph) over strings or token lists,
+which allows us to compute spectrum kernels in time linear in |s|+|t|.
+
+The construction follows Blumer et al. (1985). The Smallest Automaton
+Recognizing the Subwords of a Text.
+"""
+
+from collections import namedtuple
+
+
+SuffixAutomaton = namedtuple('SuffixAutomaton',
+                             ['length', 'link', 'transitions', 'counts'])
+
+
+def suffix_automaton(sequence):
+    """
+    builds the suffix automaton of the given sequence in O(|sequence|) time.
+
+    Each state of the automaton represents a set of substrings that share
+    the same end positions in the input sequence. These substrings are the
+    suffixes of the longest string of the state, with lengths in the range
+    ``length[link[state]]+1 ... length[state]``.
+
+    Parameters
+    ----------
+    sequence : str or list of str
+        a string (character automaton) or a list of tokens (token automaton)
+
+    Returns
+    -------
+    automaton : SuffixAutomaton
+        a (length, link, transitions, counts) named tuple of lists, indexed
+        by state ID (0 is the initial state). ``length`` is the length of the
+        longest substring of a state, ``link`` its suffix link,
+        ``transitions`` maps symbols to target states and ``counts`` is the
+        number of occurrences of the state's substrings in the sequence.
+    """
+    length, link, transitions, counts = [0], [-1], [{}], [0]
+    last = 0
+    for symbol in sequence:
+        current = len(length)
+        length.append(length[last] + 1)
+        link.append(-1)
+        transitions.append({})
+        counts.append(1)
+
+        state = last
+        while state != -1 and symbol not in transitions[state]:
+            transitions[state][symbol] = current
+            state = link[state]
+
+        if state == -1:
+            link[current] = 0
+        else:
+            target = transitions[state][symbol]
+            if length[state] + 1 == length[target]:
+                link[current] = target
+            else:  # split the target state by cloning it
+                clone = len(length)
+                length.append(length[state] + 1)
+                link.append(link[target])
+                transitions.append(dict(transitions[target]))
+                counts.append(0)
+                while state != -1 and transitions[state].get(symbol) == target:
+                    transitions[state][symbol] = clone
+                    state = link[state]
+                link[target] = link[current] = clone
+        last = current
+
+    # a state occurs wherever any of the states linking to it occur, so we
+    # propagate the counts from the longest to the shortest states
+    for state in reversed(states_by_length(length)):
+        if state != 0:
+            counts[link[state]] += counts[state]
+    return SuffixAutomaton(length, link, transitions, counts)
+
+
+def states_by_length(length):
+    """
+    returns all state IDs of an automaton sorted by the length of their
+    longest substring (counting sort, i.e. in linear time).
+    """
+    buckets = [[] for _ in xrange(max(length)+1)]
+    for state, state_length in enumerate(length):
+        buckets[state_length].append(state)
+    return [state for bucket in buckets for state in bucket]
+
+
+def matching_states(automaton, sequence, max_length):
+    """
+    runs the given sequence through the automaton and yields, for each
+    position j of the sequence, the longest suffix of ``sequence[:j+1]``
+    (but not longer than ``max_length``) that occurs in the automaton's
+    sequence.
+
+    Parameters
+    ----------
+    automaton : SuffixAutomaton
+        the suffix automaton of a sequence s
+    sequence : str or list of str
+        a sequence t
+    max_length : int
+        the maximum length (>= 1) of the matches we are interested in
+
+    Yields
+    ------
+    state : int
+        the state of the automaton that contains the match
+    matched : int
+        the length of the match
+    """
+    length, link, transitions, _counts = automaton
+    state, matched = 0, 0
+    for symbol in sequence:
+        while state != 0 and symbol not in transitions[state]:
+            state = link[state]
+            matched = length[state]
+        if symbol in transitions[state]:
+            state = transitions[state][symbol]
+            matched += 1
+        if matched > max_length:
+            matched = max_length
+            while length[link[state]] >= max_length:
+                state = link[state]
+        yield state, matched
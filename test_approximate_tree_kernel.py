@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursekernels.programming@arne.cl>
+
+from test_tree_index import TREES
+
+
+def test_approximate_tree_kernel():
+    from approximate_tree_kernel import (approximate_tree_kernel,
+                                         approximation_error, select_productions)
+    from compact_tree import DEFAULT_VOCABULARY
+    from tree import fast_tree_kernel
+    all_productions = set(select_productions(TREES, ratio=1))
+    for tree1 in TREES:
+        for tree2 in TREES:
+            assert approximate_tree_kernel(tree1, tree2, all_productions) == \
+                fast_tree_kernel(tree1, tree2)
+            assert approximate_tree_kernel(tree1, tree2, set()) == 0
+
+    s_production = DEFAULT_VOCABULARY.productions[
+        (DEFAULT_VOCABULARY.labels['S'],
+         (DEFAULT_VOCABULARY.labels['NP'], DEFAULT_VOCABULARY.labels['VP']))]
+    # only the 10 fragments rooted at S are common to both trees
+    assert approximate_tree_kernel(TREES[0], TREES[1], set([s_production])) == 10
+
+    report = approximation_error(TREES, all_productions, num_of_samples=10,
+                                 seed=23)
+    assert report.mean_absolute_error == report.max_relative_error == 0
+    assert report.pair_ratio == 1
+
+    for labels in (None, [1, 1, 0, 0, 0]):
+        selected = select_productions(TREES, ratio=0.5, labels=labels)
+        assert selected and selected < all_productions
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursekernels.programming@arne.cl>
+
+from test_tree import (import_without_notebook_packages, tree_jeff_ate_cookies,
+                       tree_steve_ate_bananas)
+
+
+def test_to_compact_tree():
+    from compact_tree import (to_compact_tree, get_children, TreeVocabulary)
+    vocabulary = TreeVocabulary(labels={}, productions={})
+    tree = to_compact_tree(tree_jeff_ate_cookies, vocabulary=vocabulary)
+    assert tree.node_ids == (1, 2, 3, 4, 5, 6, 7, 8, 9, 10)
+    labels = sorted(vocabulary.labels, key=vocabulary.labels.get)
+    assert [labels[label] for label in tree.labels] == \
+        ['S', 'NP', 'N', 'Jeff', 'VP', 'V', 'ate', 'NP', 'N', 'cookies']
+    assert get_children(tree, 0).tolist() == [1, 4]
+    assert get_children(tree, 3).tolist() == []
+    assert tree.postorder.tolist() == [3, 2, 1, 6, 5, 9, 8, 7, 4, 0]
+    # both NP -> N nodes share a production, leaves have none
+    assert tree.productions[1] == tree.productions[7] != tree.productions[0]
+    assert tree.productions[3] == -1
+    assert not tree.labels.flags.writeable
+
+
+def test_fast_tree_kernel_on_compact_trees():
+    from compact_tree import to_compact_tree
+    from tree import fast_tree_kernel
+    assert fast_tree_kernel(to_compact_tree(tree_jeff_ate_cookies),
+                            to_compact_tree(tree_steve_ate_bananas)) == 19
+    assert fast_tree_kernel(to_compact_tree(tree_jeff_ate_cookies),
+                            tree_steve_ate_bananas) == 19
+
+
+def test_mixed_vocabularies():
+    import pytest
+    from approximate_tree_kernel import approximate_tree_kernel
+    from compact_tree import to_compact_tree, TreeVocabulary
+    from tree import decayed_tree_kernel, fast_tree_kernel, get_matching_node_pairs
+    from tree_index import TreeIndex
+    vocabulary = TreeVocabulary(labels={}, productions={})
+    jeff = to_compact_tree(tree_jeff_ate_cookies, vocabulary=vocabulary)
+    # the networkx tree is converted with the vocabulary of the compact tree
+    assert fast_tree_kernel(jeff, tree_steve_ate_bananas) == 19
+    assert fast_tree_kernel(tree_steve_ate_bananas, jeff) == 19
+    assert decayed_tree_kernel(jeff, tree_steve_ate_bananas) == 19
+    assert approximate_tree_kernel(jeff, tree_steve_ate_bananas,
+                                   set(vocabulary.productions.values())) == 19
+    index = TreeIndex([jeff])
+    assert index.query(tree_steve_ate_bananas) == [(19, 0)]
+
+    steve = to_compact_tree(tree_steve_ate_bananas)
+    with pytest.raises(ValueError):
+        fast_tree_kernel(jeff, steve)
+    with pytest.raises(ValueError):
+        decayed_tree_kernel(jeff, steve)
+    with pytest.raises(ValueError):
+        get_matching_node_pairs(jeff, steve)
+    with pytest.raises(ValueError):
+        index.add(steve)
+
+
+def test_compact_tree_imports_without_notebook_packages():
+    assert import_without_notebook_packages('discoursekernels.compact_tree') == 0
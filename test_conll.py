@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursekernels.programming@arne.cl>
+
+import bz2
+
+import pytest
+
+from test_tree import import_without_notebook_packages
+from test_dependency_graph import (the_man_saw_the_woman_with_the_telescope,
+                                   with_the_telescope)
+
+
+CONLLU = """# text = the man saw the woman with the telescope
+1\tthe\tthe\tDET\tDT\t_\t2\tdt\t_\t_
+2\tman\tman\tNOUN\tNN\t_\t3\tsbj\t_\t_
+3\tsaw\tsee\tVERB\tVBD\t_\t0\troot\t_\t_
+4\tthe\tthe\tDET\tDT\t_\t5\tdt\t_\t_
+5\twoman\twoman\tNOUN\tNN\t_\t3\tobj\t_\t_
+6\twith\twith\tADP\tIN\t_\t3\tpp\t_\t_
+7\tthe\tthe\tDET\tDT\t_\t8\tdt\t_\t_
+8\ttelescope\ttelescope\tNOUN\tNN\t_\t6\tpp-obj\t_\t_
+
+1\twith\twith\tADP\tIN\t_\t0\troot\t_\t_
+1.1\tsomething\t_\t_\t_\t_\t_\t_\t_\t_
+2\tthe\tthe\tDET\tDT\t_\t3\tdt\t_\t_
+3\ttelescope\ttelescope\tNOUN\tNN\t_\t1\tpp-obj\t_\t_
+"""
+
+
+def test_read_conll():
+    from conll import DEFAULT_VOCABULARY, DependencyVocabulary, read_conll
+    from dependency_graph import dependency_kernel, dependency_kernels
+    sentence, phrase = read_conll(CONLLU.splitlines())
+    assert sentence.heads.tolist() == [-1, 2, 3, 0, 5, 3, 3, 8, 6]
+    assert sentence.words[0] == DEFAULT_VOCABULARY.words['*']
+    assert sentence.relations[3] == DEFAULT_VOCABULARY.relations['root']
+    assert len(phrase.words) == 4
+
+    # the artificial root nodes ('*') don't share a dependent
+    assert dependency_kernel(sentence, phrase) == dependency_kernel(
+        the_man_saw_the_woman_with_the_telescope, with_the_telescope) == 3
+    assert dependency_kernels(sentence, [sentence, phrase]) == [
+        dependency_kernel(the_man_saw_the_woman_with_the_telescope,
+                          the_man_saw_the_woman_with_the_telescope), 3]
+
+    # compact graphs can't be compared to networkx graphs or to compact
+    # graphs built with another vocabulary
+    with pytest.raises(ValueError):
+        dependency_kernel(sentence, with_the_telescope)
+    with pytest.raises(ValueError):
+        dependency_kernels(sentence, [phrase, with_the_telescope])
+    other_phrase = list(read_conll(CONLLU.splitlines(),
+                                   vocabulary=DependencyVocabulary({}, {})))[1]
+    with pytest.raises(ValueError):
+        dependency_kernel(sentence, other_phrase)
+
+    with pytest.raises(ValueError):
+        list(read_conll(['2\tthe\tthe\tDET\tDT\t_\t2\tdt\t_\t_']))
+
+
+def test_read_conll_file(tmpdir):
+    from conll import read_conll_file
+    path = str(tmpdir.join('corpus.conllu.bz2'))
+    with bz2.BZ2File(path, 'wb') as conll_file:
+        conll_file.write(CONLLU)
+    assert len(list(read_conll_file(path))) == 2
+
+
+def test_conll_imports_without_notebook_packages():
+    assert import_without_notebook_packages('discoursekernels.conll') == 0
@@ -4,6 +4,7 @@
 
 import networkx as nx
 from discoursekernels.util import label_nodes, label_edges
+from test_tree import import_without_notebook_packages
 
 # Example dependency graphs
 
@@ -34,3 +35,96 @@ with_the_telescope.add_nodes_from(label_nodes(
 with_the_telescope.add_edges_from(label_edges(
     [(1, 2, 'pp-obj'), (2, 3, 'dt')]
 ))
+
+
+GRAPHS = [the_man_saw_the_woman_with_the_telescope, the_man, with_the_telescope]
+
+
+def test_dependency_kernel():
+    from dependency_graph import (common_subgraph_counts, count_common_subgraphs,
+                                  dependency_kernel, get_dependency_index)
+    for graph1 in GRAPHS:
+        for graph2 in GRAPHS:
+            counts = common_subgraph_counts(graph1, graph2)
+            for n1 in graph1:
+                for n2 in graph2:
+                    assert counts.get((n1, n2), 0) == \
+                        count_common_subgraphs(graph1, graph2, n1, n2)
+            assert dependency_kernel(graph1, graph2) == sum(counts.values())
+
+    telescope_index = get_dependency_index(with_the_telescope)
+    assert dependency_kernel(the_man_saw_the_woman_with_the_telescope,
+                             telescope_index) == 3
+
+
+def test_dependency_kernels():
+    from dependency_graph import (dependency_kernel, dependency_kernels,
+                                  get_dependency_index)
+    indexes = [get_dependency_index(graph) for graph in GRAPHS]
+    for query in GRAPHS:
+        assert dependency_kernels(query, indexes) == \
+            [dependency_kernel(query, graph) for graph in GRAPHS]
+    assert dependency_kernels(the_man, [with_the_telescope]) == [0]
+    assert sorted(indexes[0].label_buckets) == \
+        ['*', 'man', 'saw', 'telescope', 'with', 'woman']
+
+
+def test_get_dependency_fragments():
+    from dependency_graph import get_dependency_fragments, get_dependency_subgraphs
+    graph = the_man_saw_the_woman_with_the_telescope
+    fragments = [sorted(fragment.nodes())
+                 for fragment in get_dependency_fragments(graph)]
+    assert len(fragments) == len(set(map(tuple, fragments)))
+    assert sorted(fragments) == sorted(
+        sorted(subgraph.nodes()) for subgraph in get_dependency_subgraphs(graph))
+
+    assert sorted(sorted(fragment.nodes()) for fragment in
+                  get_dependency_fragments(with_the_telescope)) == \
+        [[1, 2], [1, 2, 3], [2, 3]]
+    assert all(2 <= len(fragment) <= 3
+               for fragment in get_dependency_fragments(graph, max_size=3))
+    assert len(list(get_dependency_fragments(graph, root_node=7))) == 2
+
+
+def test_dependency_subgraph_frequencies():
+    from dependency_graph import (DAG_SIGNATURE_PREFIX,
+                                  dependency_fragment_signature,
+                                  dependency_subgraph_frequencies,
+                                  generate_all_unique_dependency_subgraphs)
+    graph = the_man_saw_the_woman_with_the_telescope
+    assert dependency_fragment_signature(graph.subgraph([2, 3, 4, 5])) == \
+        u'(saw (obj woman) (sbj (man (dt the))))'
+    assert dependency_fragment_signature(the_man) == \
+        dependency_fragment_signature(graph.subgraph([3, 4]))
+
+    subgraphs, frequencies = dependency_subgraph_frequencies(GRAPHS)
+    signatures = [dependency_fragment_signature(subgraph)
+                  for subgraph in subgraphs]
+    assert len(signatures) == len(set(signatures))
+    assert frequencies[signatures.index(u'(man (dt the))')] == 2
+    assert frequencies[signatures.index(u'(with (pp-obj (telescope (dt the))))')] == 2
+    assert len(generate_all_unique_dependency_subgraphs(GRAPHS)) == len(subgraphs)
+
+    # a subgraph that isn't a tree
+    diamond = nx.DiGraph()
+    diamond.add_nodes_from(label_nodes([(1, 'a'), (2, 'b'), (3, 'c'), (4, 'd')]))
+    diamond.add_edges_from(label_edges([(1, 2, 'x'), (1, 3, 'y'),
+                                        (2, 4, 'z'), (3, 4, 'z')]))
+    assert dependency_fragment_signature(diamond).startswith(DAG_SIGNATURE_PREFIX)
+    subgraphs, frequencies = dependency_subgraph_frequencies([diamond, diamond])
+    assert frequencies == [2] * len(subgraphs)
+
+    # UTF-8 encoded byte string labels
+    mueller = nx.DiGraph()
+    mueller.add_nodes_from(label_nodes([(1, 'sah'), (2, 'M\xc3\xbcller'),
+                                        (3, 'Frau')]))
+    mueller.add_edges_from(label_edges([(1, 2, 'sbj'), (1, 3, 'obj'),
+                                        (2, 3, 'm\xc3\xb6d')]))
+    assert dependency_fragment_signature(mueller.subgraph([1, 2])) == \
+        u'(sah (sbj M\xfcller))'
+    assert dependency_fragment_signature(mueller).startswith(DAG_SIGNATURE_PREFIX)
+
+
+def test_dependency_graph_imports_without_notebook_packages():
+    assert import_without_notebook_packages(
+        'discoursekernels.dependency_graph') == 0
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursekernels.programming@arne.cl>
+
+
+def test_encode_decode():
+    from encoding import encode_corpus, decode, ngram_windows
+    corpus = ['the cat sat'.split(), 'the dog sat'.split()]
+    encoded_corpus, vocabulary = encode_corpus(corpus)
+    assert [doc.tolist() for doc in encoded_corpus] == [[0, 1, 2], [0, 3, 2]]
+    assert decode(encoded_corpus[1], vocabulary) == corpus[1]
+    assert ngram_windows(encoded_corpus[0], 2).tolist() == [[0, 1], [1, 2]]
+    assert ngram_windows(encoded_corpus[0], 4).shape == (0, 4)
+
+
+def test_kernels_accept_encoded_sequences():
+    from encoding import encode_corpus
+    from spectrum_kernel import (p_spectrum_kernel, p_spectrum_kernel_linear,
+                                 bruteforce_blended_spectrum_kernel)
+    from subsequence_kernels import (all_subsequences_kernel_recursive,
+                                     all_subsequences_kernel_dp1,
+                                     fixed_length_subsequences_kernel_recursive,
+                                     fixed_length_subsequences_kernel_dp1)
+    (s, t), _vocabulary = encode_corpus(['gatta', 'cata'])
+    assert p_spectrum_kernel(s, t, 2) == p_spectrum_kernel('gatta', 'cata', 2)
+    assert p_spectrum_kernel_linear(s, t, 2) == 2
+    assert bruteforce_blended_spectrum_kernel(s, t, 2) == 8
+    assert all_subsequences_kernel_recursive(s, t) == 14
+    assert all_subsequences_kernel_dp1(s, t) == 14
+    assert fixed_length_subsequences_kernel_recursive(s, t, 2) == 5
+    assert fixed_length_subsequences_kernel_dp1(s, t, 2) == \
+        fixed_length_subsequences_kernel_dp1('gatta', 'cata', 2)
+
+
+def test_spectra_of_encoded_sequences():
+    from encoding import encode_corpus
+    from spectrum_kernel import blended_spectrum_kernel, p_spectrum
+    (s, t), vocabulary = encode_corpus(['abab', 'ab'])
+    a, b = vocabulary['a'], vocabulary['b']
+    assert p_spectrum(s, 2) == {(a, b): 2, (b, a): 1, (b, -1): 1}
+    assert blended_spectrum_kernel(s, t, 2) == \
+        blended_spectrum_kernel(t, s, 2) == \
+        blended_spectrum_kernel('ab', 'abab', 2)
@@ -17,6 +17,14 @@ def test_k_suffix_kernel():
         assert k_suffix_kernel(*params) == result
 
 
+def test_p_spectrum():
+    from spectrum_kernel import ngrams, p_spectrum
+    assert p_spectrum('the cat'.split(), 2) == \
+        {('the', 'cat'): 1, ('cat', ' '): 1}
+    assert list(ngrams(['a', 'b', 'c'], 2, pad='X')) == \
+        [('a', 'b'), ('b', 'c'), ('c', 'X')]
+    assert p_spectrum('abab', 2) == {('a', 'b'): 2, ('b', 'a'): 1, ('b', ' '): 1}
+
 PSPECTRUM_KERNEL_PARAMS = {
     ('bar', 'bar', 2): 2,
     ('bar', 'bat', 2): 1,
@@ -97,3 +105,51 @@ def test_blended_spectrum_kernel():
     from test_matlab_blended_kernel import BLENDED_SPECTRUM_KERNEL_PARAMS
     for params, result in BLENDED_SPECTRUM_KERNEL_PARAMS.iteritems():
         assert blended_spectrum_kernel(*params) == result
+
+
+def test_p_spectrum_kernel_linear():
+    from spectrum_kernel import p_spectrum_kernel_linear
+    for params, result in PSPECTRUM_KERNEL_PARAMS.iteritems():
+        assert p_spectrum_kernel_linear(*params) == result
+    assert p_spectrum_kernel_linear('aaaa', 'aaa', 2) == 6
+    assert p_spectrum_kernel_linear('the cat sat'.split(),
+                                    'the cat ran'.split(), 2) == 1
+
+
+def test_blended_spectrum_kernel_linear():
+    from spectrum_kernel import blended_spectrum_kernel_linear
+    for params, result in BBS_KERNEL_PARAMS.iteritems():
+        assert blended_spectrum_kernel_linear(*params) == result
+    # 'a' and 'b' match once (weight 2**2), 'ab' matches once (weight 2**4)
+    assert blended_spectrum_kernel_linear('ab', 'ab', 2, 2) == 4 + 4 + 16
+
+
+def test_spectrum_gram_matrix():
+    from spectrum_kernel import (spectrum_gram_matrix, spectrum_vectorize,
+                                 p_spectrum_kernel_linear,
+                                 blended_spectrum_kernel_linear)
+    corpus = ['statistics', 'computation', 'bieber', 'fieber', 'a', '']
+    gram = spectrum_gram_matrix(corpus, 3).toarray()
+    blended_gram = spectrum_gram_matrix(corpus, 3, lambda_weight=2).toarray()
+    for i, s in enumerate(corpus):
+        for j, t in enumerate(corpus):
+            assert gram[i, j] == p_spectrum_kernel_linear(s, t, 3)
+            assert blended_gram[i, j] == \
+                blended_spectrum_kernel_linear(s, t, 3, 2)
+
+    features, vocabulary = spectrum_vectorize(['bar', 'bat'], 2)
+    new_features, _ = spectrum_vectorize(['car'], 2, vocabulary=vocabulary)
+    assert new_features.dot(features.T).toarray().tolist() == [[1, 0]]
+
+
+def test_hashed_spectrum():
+    from spectrum_kernel import hashed_spectrum, hashed_spectrum_vectorize
+    for (s, t, p), result in PSPECTRUM_KERNEL_PARAMS.iteritems():
+        # n-grams that span chunk boundaries must be counted as well
+        s_chunks = [s[:len(s)//2], s[len(s)//2:]]
+        assert hashed_spectrum(s_chunks, p).dot(hashed_spectrum([t], p)) \
+            == result
+
+    documents = [[['the', 'cat'], ['sat']], [['the', 'cat', 'ran']]]
+    features = hashed_spectrum_vectorize(documents, 2, n_buckets=2**10)
+    assert features.dot(features.T).toarray().tolist() == [[2, 1], [1, 2]]
@@ -49,3 +49,136 @@ def test_fixed_length_subsequences_kernel_recursive():
     for params, result in FLS_KERNEL_PARAMS.iteritems():
         assert fixed_length_subsequences_kernel_recursive(*params) == result
 
+
+
+def test_all_subsequences_kernel_vectorized():
+    import pytest
+    from subsequence_kernels import (all_subsequences_kernel_vectorized,
+                                     all_subsequences_kernel_recursive)
+    from encoding import encode_corpus
+    for params, result in ASK_PARAMS.iteritems():
+        assert all_subsequences_kernel_vectorized(*params) == result
+        encoded_params, _vocabulary = encode_corpus(params)
+        assert all_subsequences_kernel_vectorized(*encoded_params) == result
+
+    s, t = 'the man saw the woman'.split(), 'the woman saw the man'.split()
+    assert all_subsequences_kernel_vectorized(s, t) == \
+        all_subsequences_kernel_recursive(s, t)
+
+    # symbol IDs can't be compared to characters
+    (s, t), _vocabulary = encode_corpus(['gatta', 'cata'])
+    with pytest.raises(ValueError):
+        all_subsequences_kernel_vectorized(s, 'cata')
+    with pytest.raises(ValueError):
+        all_subsequences_kernel_vectorized('gatta', t)
+
+
+GWS_KERNEL_PARAMS = [
+    ('gatta', 'cata', 2, 0.5),
+    ('gatta', 'cata', 3, 0.5),
+    ('statistics', 'computation', 3, 0.8),
+    ('the man saw the woman'.split(), 'the woman saw the man'.split(), 2, 1),
+]
+
+
+def test_gap_weighted_subsequences_kernel_sparse():
+    from subsequence_kernels import (gap_weighted_subsequences_kernel_sparse,
+                                     gap_weighted_subsequences_kernel_dp1)
+    for params in GWS_KERNEL_PARAMS:
+        assert abs(gap_weighted_subsequences_kernel_sparse(*params) -
+                   gap_weighted_subsequences_kernel_dp1(*params)) < 1e-12
+    # 'a' and 't' match 2x2 and 2x1 times
+    assert gap_weighted_subsequences_kernel_sparse('gatta', 'cata', 1, 2) == 24
+    # the lazily applied decay along s must not overflow
+    s, t = 'ab' + 'c' * 2000 + 'ab', 'ab'
+    assert abs(gap_weighted_subsequences_kernel_sparse(s, t, 2, 0.5) -
+               2 * 0.5**4) < 1e-12
+
+
+def test_subsequences_kernels_for_all_lengths():
+    import pytest
+    from encoding import encode_corpus
+    from subsequence_kernels import (fixed_length_subsequences_kernels,
+                                     gap_weighted_subsequences_kernels,
+                                     gap_weighted_subsequences_kernel_sparse)
+    for (s, t, p), result in FLS_KERNEL_PARAMS.iteritems():
+        if p > 0:
+            assert fixed_length_subsequences_kernels(s, t, p)[-1] == result
+    assert fixed_length_subsequences_kernels('gatta', 'cata', 3).tolist() == \
+        [6, 5, 2]
+    assert fixed_length_subsequences_kernels('gatta', 'cata', 3,
+                                             weights=[1, 10, 100]) == 256
+    (s, t), _vocabulary = encode_corpus(['gatta', 'cata'])
+    assert fixed_length_subsequences_kernels(s, t, 3).tolist() == [6, 5, 2]
+    with pytest.raises(ValueError):
+        fixed_length_subsequences_kernels(s, 'cata', 3)
+
+    kernels = gap_weighted_subsequences_kernels('statistics', 'computation',
+                                                4, 0.8)
+    for p, kernel in enumerate(kernels, 1):
+        assert kernel == gap_weighted_subsequences_kernel_sparse(
+            'statistics', 'computation', p, 0.8)
+    assert abs(gap_weighted_subsequences_kernels(
+        'statistics', 'computation', 4, 0.8, weights=[1, 1, 1, 1]) -
+        sum(kernels)) < 1e-12
+
+    # no subsequence lengths, no kernel values
+    assert len(fixed_length_subsequences_kernels('gatta', 'cata', 0)) == 0
+    assert len(gap_weighted_subsequences_kernels('gatta', 'cata', 0, 0.5)) == 0
+    assert len(gap_weighted_subsequences_kernels('gatta', 'cata', 0, 0)) == 0
+
+
+def test_gap_weighted_subsequences_kernel_dp1_lambda_array():
+    import numpy
+    from subsequence_kernels import gap_weighted_subsequences_kernel_dp1
+    lambdas = numpy.linspace(0.1, 1, 10)
+    for s, t, p, _lambda_weight in GWS_KERNEL_PARAMS:
+        kernels = gap_weighted_subsequences_kernel_dp1(s, t, p, lambdas)
+        assert kernels.shape == lambdas.shape
+        for lambda_weight, kernel in zip(lambdas, kernels):
+            assert abs(kernel - gap_weighted_subsequences_kernel_dp1(
+                s, t, p, lambda_weight)) < 1e-12
+
+
+def test_batch_subsequences_kernels():
+    from subsequence_kernels import (
+        all_subsequences_kernel_batch, fixed_length_subsequences_kernel_batch,
+        gap_weighted_subsequences_kernel_batch, subsequences_gram_matrix,
+        all_subsequences_kernel_vectorized, gap_weighted_subsequences_kernel_sparse)
+    s_batch, t_batch = zip(*ASK_PARAMS.keys())
+    assert all_subsequences_kernel_batch(s_batch, t_batch).tolist() == \
+        ASK_PARAMS.values()
+
+    fls_params = [params for params in FLS_KERNEL_PARAMS if params[2] == 1]
+    s_batch, t_batch, _p = zip(*fls_params)
+    assert fixed_length_subsequences_kernel_batch(s_batch, t_batch, 1).tolist() \
+        == [FLS_KERNEL_PARAMS[params] for params in fls_params]
+
+    s_batch, t_batch = ['gatta', 'statistics', 'a'], ['cata', 'computation', '']
+    for p in (0, 1, 2, 3):
+        kernels = gap_weighted_subsequences_kernel_batch(s_batch, t_batch, p, 0.5)
+        for s, t, kernel in zip(s_batch, t_batch, kernels):
+            assert abs(kernel - gap_weighted_subsequences_kernel_sparse(
+                s, t, p, 0.5)) < 1e-12
+
+    corpus = ['gatta', 'cata', 'bar', 'car', '']
+    gram_matrix = subsequences_gram_matrix(
+        corpus, all_subsequences_kernel_batch, batch_size=4)
+    for i, s in enumerate(corpus):
+        for j, t in enumerate(corpus):
+            assert gram_matrix[i, j] == all_subsequences_kernel_vectorized(s, t)
+
+
+def test_iterative_subsequences_kernels():
+    from subsequence_kernels import (
+        all_subsequences_kernel_iterative, all_subsequences_kernel_recursive,
+        fixed_length_subsequences_kernel_iterative,
+        fixed_length_subsequences_kernel_recursive)
+    for params, result in ASK_PARAMS.iteritems():
+        assert all_subsequences_kernel_iterative(*params) == result
+    for params, result in FLS_KERNEL_PARAMS.iteritems():
+        assert fixed_length_subsequences_kernel_iterative(*params) == result
+
+    # these inputs would exceed the recursion limit without dispatching
+    assert all_subsequences_kernel_recursive('a' * 2000, 'b') == 1
+    assert fixed_length_subsequences_kernel_recursive('a' * 2000, 'a', 1) == 2000
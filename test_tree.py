@@ -203,3 +203,148 @@ tree_the_man_killed_the_woman.add_edges_from([
     (11, 12), # D the
     (13, 14), # N woman
 ])
+
+
+def test_fast_tree_kernel():
+    from tree import fast_tree_kernel
+    # common fragments are rooted at S (10), VP (4), V (1) and NP (4x1)
+    assert fast_tree_kernel(tree_jeff_ate_cookies, tree_steve_ate_bananas) == 19
+    assert fast_tree_kernel(tree_alex_died, tree_fragment_npn) == 1
+    assert fast_tree_kernel(tree_the_man_drank_wine,
+                            tree_the_man_killed_the_woman) == \
+        fast_tree_kernel(tree_the_man_killed_the_woman,
+                         tree_the_man_drank_wine)
+
+
+def test_production_index():
+    from tree import get_production_index, get_subtree_productions
+    tree = tree_jeff_ate_cookies.copy()
+    index = get_production_index(tree, node_attrib='label')
+    assert get_production_index(tree, node_attrib='label') is index
+    assert ('S', ('NP', 'VP')) in get_subtree_productions(tree, node_attrib='label')
+
+    # the index is rebuilt after the tree was mutated
+    tree.add_node(100, label='PP')
+    tree.add_edge(index.root, 100)
+    new_index = get_production_index(tree, node_attrib='label')
+    assert new_index is not index
+    assert ('S', ('NP', 'VP')) not in new_index.subtree_productions[new_index.root]
+
+    # rewiring an edge doesn't change the number of nodes or edges
+    tree.remove_edge(3, 4)
+    tree.add_edge(9, 4)
+    rules = get_subtree_productions(tree, node_attrib='label')
+    assert ('N', ('Jeff',)) not in rules
+    assert ('N', ('Jeff', 'cookies')) in rules
+
+
+def test_get_tree_fragments():
+    from tree import get_subtrees, get_tree_fragments
+    fragments = [sorted(fragment.nodes())
+                 for fragment in get_tree_fragments(tree_jeff_ate_cookies)]
+    assert len(fragments) == 34
+    assert sorted(fragments) == sorted(
+        sorted(subtree.nodes()) for subtree in
+        get_subtrees(tree_jeff_ate_cookies, node_attrib='label'))
+
+    # S -> NP VP, NP -> N, VP -> V NP
+    assert [1, 2, 3, 5, 6, 8] in fragments
+    # fragments rooted at S with one or two production levels
+    assert len(list(get_tree_fragments(
+        tree_jeff_ate_cookies, root_node=1, max_depth=2))) == 4
+    assert all(len(fragment) <= 4 for fragment in get_tree_fragments(
+        tree_jeff_ate_cookies, max_size=4))
+    assert len(list(get_tree_fragments(tree_jeff_ate_cookies, max_size=2))) == 5
+
+
+def test_fragment_signature():
+    from tree import (fragment_signature, find_all_common_subtrees_bruteforce,
+                      generate_all_unique_subtrees)
+    assert fragment_signature(tree_fragment_npn) == u'(NP N)'
+    assert fragment_signature(tree_jeff_ate_cookies) == \
+        u'(S (NP (N Jeff)) (VP (V ate) (NP (N cookies))))'
+
+    brackets = DiGraph()
+    brackets.add_nodes_from(label_nodes([(1, '-LRB-'), (2, '('), (3, 'a b')]))
+    brackets.add_edges_from([(1, 2), (1, 3)])
+    assert fragment_signature(brackets) == u'(-LRB- \\( a\\ b)'
+
+    umlauts = DiGraph()
+    umlauts.add_nodes_from(label_nodes([(1, 'NE'), (2, 'M\xc3\xbcller')]))
+    umlauts.add_edge(1, 2)
+    assert fragment_signature(umlauts) == u'(NE M\xfcller)'
+
+    unique_subtrees = generate_all_unique_subtrees(tree_jeff_ate_cookies,
+                                                   tree_steve_ate_bananas)
+    signatures = [fragment_signature(subtree) for subtree in unique_subtrees]
+    assert len(signatures) == len(set(signatures)) == 50
+    assert len(find_all_common_subtrees_bruteforce(
+        tree_jeff_ate_cookies, tree_steve_ate_bananas)) == 19
+    # both trees have the same node IDs, but the two NP -> N productions
+    # (2 -> 3 and 8 -> 9) don't match anymore
+    assert len(find_all_common_subtrees_bruteforce(
+        tree_jeff_ate_cookies, tree_steve_ate_bananas, node_attrib=None)) == 34
+
+
+def test_tree_fragment_vectorize():
+    from tree import fast_tree_kernel, fragment_signature, tree_fragment_vectorize
+    trees = [tree_jeff_ate_cookies, tree_steve_ate_bananas, tree_alex_died,
+             tree_the_man_drank_wine, tree_the_man_killed_the_woman]
+    features, vocabulary = tree_fragment_vectorize(trees)
+    gram_matrix = (features * features.T).toarray()
+    for i, tree1 in enumerate(trees):
+        for j, tree2 in enumerate(trees):
+            assert gram_matrix[i, j] == fast_tree_kernel(tree1, tree2)
+    assert fragment_signature(tree_jeff_ate_cookies) in vocabulary
+
+    features, vocabulary = tree_fragment_vectorize(trees, min_support=2)
+    assert (features > 0).sum(axis=0).min() >= 2
+    assert fragment_signature(tree_jeff_ate_cookies) not in vocabulary
+    assert u'(S NP (VP V NP))' in vocabulary
+
+    features, vocabulary = tree_fragment_vectorize(trees, max_size=3)
+    assert u'(S NP VP)' in vocabulary
+    assert u'(S (NP N) VP)' not in vocabulary
+
+    mueller = DiGraph()
+    mueller.add_nodes_from(label_nodes([(1, 'NP'), (2, 'NE'), (3, 'M\xc3\xbcller')]))
+    mueller.add_edges_from([(1, 2), (2, 3)])
+    features, vocabulary = tree_fragment_vectorize([mueller, mueller])
+    assert u'(NP (NE M\xfcller))' in vocabulary
+    assert (features * features.T).toarray().tolist() == [[3, 3], [3, 3]]
+
+
+def test_decayed_tree_kernel():
+    from tree import decayed_tree_kernel, fast_tree_kernel
+    trees = [tree_jeff_ate_cookies, tree_steve_ate_bananas, tree_alex_died,
+             tree_the_man_drank_wine, tree_the_man_killed_the_woman]
+    for tree1 in trees:
+        for tree2 in trees:
+            assert decayed_tree_kernel(tree1, tree2) == \
+                fast_tree_kernel(tree1, tree2)
+
+    # the only common fragment is NP -> N
+    assert decayed_tree_kernel(tree_alex_died, tree_fragment_npn,
+                               lambda_weight=0.5) == 0.5
+    # the only common complete subtree is V -> ate
+    assert decayed_tree_kernel(tree_jeff_ate_cookies, tree_steve_ate_bananas,
+                               lambda_weight=0.5, sigma=0) == 0.5
+
+
+def import_without_notebook_packages(module):
+    """
+    imports a module in a fresh interpreter, in which IPython, pygments and
+    nxpd can't be imported, and returns the exit code of the interpreter.
+    """
+    import os
+    import subprocess
+    import sys
+    code = ("import sys\n"
+            "sys.modules.update(IPython=None, pygments=None, nxpd=None)\n"
+            "import {}".format(module))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    return subprocess.call([sys.executable, '-c', code], env=env)
+
+
+def test_tree_imports_without_notebook_packages():
+    assert import_without_notebook_packages('discoursekernels.tree') == 0
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursekernels.programming@arne.cl>
+
+from test_tree import (tree_alex_died, tree_fragment_npn, tree_jeff_ate_cookies,
+                       tree_steve_ate_bananas, tree_the_man_drank_wine,
+                       tree_the_man_killed_the_woman)
+
+
+TREES = [tree_jeff_ate_cookies, tree_steve_ate_bananas, tree_alex_died,
+         tree_the_man_drank_wine, tree_the_man_killed_the_woman]
+
+
+def test_tree_index():
+    from tree import fast_tree_kernel
+    from tree_index import TreeIndex
+    index = TreeIndex(TREES)
+    assert len(index) == 5
+    for query in TREES + [tree_fragment_npn]:
+        bounds = index.upper_bounds(query)
+        kernels = [(fast_tree_kernel(query, tree), tree_id)
+                   for tree_id, tree in enumerate(TREES)]
+        for kernel, tree_id in kernels:
+            assert kernel <= bounds.get(tree_id, 0)
+        expected = sorted(((kernel, tree_id) for kernel, tree_id in kernels
+                           if kernel > 0),
+                          key=lambda (kernel, tree_id): (-kernel, tree_id))
+        for k in (1, 2, 5):
+            results = index.query(query, k=k)
+            assert [kernel for kernel, _ in results] == \
+                [kernel for kernel, _ in expected[:k]]
+    assert index.query(tree_jeff_ate_cookies, k=2) == [(36, 0), (19, 1)]
+    assert index.query(tree_jeff_ate_cookies, k=0) == []
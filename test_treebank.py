@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursekernels.programming@arne.cl>
+
+import gzip
+
+import pytest
+
+from test_tree import (import_without_notebook_packages, tree_jeff_ate_cookies,
+                       tree_steve_ate_bananas)
+
+
+TREEBANK = """( (S (NP (N Jeff))
+       (VP (V ate) (NP (N cookies)))) )
+(S (NP (N Steve)) (VP (V ate) (NP (N bananas)))) (NP (N -LRB-))
+"""
+
+
+def test_read_bracketed_trees():
+    from compact_tree import to_compact_tree
+    from tree import fast_tree_kernel
+    from treebank import read_bracketed_trees
+    jeff, steve, lrb = read_bracketed_trees(TREEBANK.splitlines())
+    assert jeff.labels.tolist() == \
+        to_compact_tree(tree_jeff_ate_cookies).labels.tolist()
+    assert jeff.postorder.tolist() == [3, 2, 1, 6, 5, 9, 8, 7, 4, 0]
+    assert fast_tree_kernel(jeff, steve) == \
+        fast_tree_kernel(tree_jeff_ate_cookies, tree_steve_ate_bananas) == 19
+    assert len(lrb.labels) == 3
+
+    with pytest.raises(ValueError):
+        list(read_bracketed_trees(['(S (NP (N Jeff))) )']))
+    with pytest.raises(ValueError):
+        list(read_bracketed_trees(['(S (NP (N Jeff))']))
+
+
+def test_read_treebank(tmpdir):
+    from treebank import read_treebank
+    path = str(tmpdir.join('treebank.mrg.gz'))
+    with gzip.open(path, 'wb') as treebank_file:
+        treebank_file.write(TREEBANK)
+    assert len(list(read_treebank(path))) == 3
+
+
+def test_treebank_imports_without_notebook_packages():
+    assert import_without_notebook_packages('discoursekernels.treebank') == 0
@@ -2,32 +2,74 @@
 # -*- coding: utf-8 -*-
 # Author: Arne Neumann <discoursekernels.programming@arne.cl>
 
+from collections import Counter, defaultdict, namedtuple
 import itertools
+from weakref import WeakKeyDictionary
+
 import networkx as nx
-from networkx.algorithms import isomorphism as iso
+import numpy
 from networkx import DiGraph, dfs_edges, is_arborescence, topological_sort
 from networkx.algorithms.traversal.depth_first_search import dfs_tree
 from ordered_set import OrderedSet
+from scipy.sparse import csr_matrix
+
+from compact_tree import as_compact_trees, get_children, get_children_lists
+from util import escape_label
+
+
+ProductionIndex = namedtuple('ProductionIndex', ['fingerprint', 'root',
+                                                 'productions',
+                                                 'subtree_productions'])
+
+# maps each tree to its production indexes (one per node attribute)
+_PRODUCTION_INDEXES = WeakKeyDictionary()
 
 
 def generate_all_unique_subtrees(*trees):
     node_attrib = 'label'
-    same_node_label = iso.categorical_node_match(node_attrib, '')
-    if len(trees) == 0:
-        return []
-    elif len(trees) == 1:
-        return list(get_subtrees(trees[0], node_attrib=node_attrib))
-    else:
-        unique_subtrees = list(get_subtrees(trees[0], node_attrib=node_attrib))
-        for tree in trees[1:]:
-            for subtree in get_subtrees(tree, node_attrib=node_attrib):
-                # match each new subtree against all subtrees already in unique_subtrees
-                # if it is not isomorphic (incl. matching node labels) to any of the existing
-                # subtrees, it will be added to the list
-                if not any(nx.is_isomorphic(new_subtree, old_subtree, node_match=same_node_label)
-                           for new_subtree, old_subtree in itertools.product([subtree], unique_subtrees)):
-                    unique_subtrees.append(subtree)
-        return unique_subtrees
+    unique_subtrees = []
+    seen_signatures = set()
+    for tree in trees:
+        for subtree in get_tree_fragments(tree):
+            # a subtree will only be added to the list, if no subtree with
+            # the same structure and node labels was seen before
+            signature = fragment_signature(subtree, node_attrib=node_attrib)
+            if signature not in seen_signatures:
+                seen_signatures.add(signature)
+                unique_subtrees.append(subtree)
+    return unique_subtrees
+
+
+def fragment_signature(fragment, node_attrib='label'):
+    """
+    returns a canonical, bracketed string representation of a tree fragment,
+    e.g. ``(S (NP N) VP)``. Two fragments have the same signature, iff they
+    have the same structure and node labels. The children of each node are
+    ordered by their node IDs (just like in get_production_rules()).
+
+    Brackets, spaces and backslashes in node labels are escaped with a
+    backslash, so that different fragments can't have the same signature.
+
+    Parameters
+    ----------
+    fragment : networkx.DiGraph
+        a (sub)tree represented as a digraph
+    node_attrib : str or None
+        If a node attribute is given (e.g. 'label'), its value is used as the
+        node label. Otherwise, the node IDs are used.
+    """
+    signatures = {}
+    for node in nx.dfs_postorder_nodes(fragment):
+        label = fragment.node[node][node_attrib] if node_attrib else node
+        label = escape_label(label)
+        children = sorted(fragment.successors(node))
+        if children:
+            signatures[node] = u'({} {})'.format(
+                label, u' '.join(signatures[child] for child in children))
+        else:
+            signatures[node] = label
+    # the root node is the first element in a topological sort of the tree
+    return signatures[topological_sort(fragment)[0]]
 
 
 def is_rooted_at_node(tree, subtree, tree_node, node_attrib=None):
@@ -43,8 +85,21 @@ def is_rooted_at_node(tree, subtree, tree_node, node_attrib=None):
         (same node labels if node_attrib is given, otherwise: same node IDs).
         Otherwise, returns 0.
     """
+    return _is_rooted_at_node(
+        tree, subtree, tree_node,
+        get_production_index(tree, node_attrib=node_attrib),
+        get_production_index(subtree, node_attrib=node_attrib),
+        node_attrib=node_attrib)
+
+
+def _is_rooted_at_node(tree, subtree, tree_node, tree_index, subtree_index,
+                       node_attrib=None):
+    """
+    is_rooted_at_node() with the production indexes of the tree and the
+    subtree given, so that they are only looked up once per top-level call.
+    """
     # the root node of a tree is the first element in a topological sort of the tree
-    subtree_root_node = topological_sort(subtree)[0]
+    subtree_root_node = subtree_index.root
     
     # a subtree can only be rooted at a tree's tree_node (n),
     # if the tree node and the subtree root node are equal
@@ -55,9 +110,9 @@ def is_rooted_at_node(tree, subtree, tree_node, node_attrib=None):
         if tree_node != subtree_root_node:
             return 0
 
-    tree_subtree_rules = get_production_rules(tree, root_node=tree_node, node_attrib=node_attrib)
-    subtree_rules = get_production_rules(subtree, node_attrib=node_attrib)
-    if all(st_rule in tree_subtree_rules for st_rule in subtree_rules):
+    tree_subtree_rules = _subtree_productions(tree_index, root_node=tree_node)
+    subtree_rules = _subtree_productions(subtree_index)
+    if subtree_rules <= tree_subtree_rules:
         return 1
     else:
         return 0
@@ -67,12 +122,14 @@ def count_tree_fragment_occurances(tree, subtree, node_attrib='label'):
     """
     $h_i(T_1)$ : how often does subtree i occur in Tree 1?
     """
+    tree_index = get_production_index(tree, node_attrib=node_attrib)
+    subtree_index = get_production_index(subtree, node_attrib=node_attrib)
     counter = 0
     for node in tree.nodes_iter():
         # is_rooted() returns one if the productions of the subtree and
         # the productions of the tree (beginning at "node") are the same
-        counter += is_rooted_at_node(tree, subtree, tree_node=node,
-                                     node_attrib=node_attrib)
+        counter += _is_rooted_at_node(tree, subtree, node, tree_index,
+                                      subtree_index, node_attrib=node_attrib)
     return counter
 
 
@@ -82,8 +139,18 @@ def common_subtrees(tree1, tree2, n1, n2, node_attrib='label'):
     _common subtrees_ rooted at both $n_1$ and $n_2$
     and is defined as $\sum_i I_i(n_1) I_i(n_2)$
     """
-    n1_rules = get_production_rules(tree1, n1, node_attrib=node_attrib)
-    n2_rules = get_production_rules(tree2, n2, node_attrib=node_attrib)
+    return _common_subtrees(tree1, tree2, n1, n2,
+                            get_production_index(tree1, node_attrib=node_attrib),
+                            get_production_index(tree2, node_attrib=node_attrib))
+
+
+def _common_subtrees(tree1, tree2, n1, n2, index1, index2):
+    """
+    common_subtrees() with the production indexes of both trees given, so
+    that they are only looked up once per top-level call.
+    """
+    n1_rules = _subtree_productions(index1, n1)
+    n2_rules = _subtree_productions(index2, n2)
     
     if min(len(n1_rules), len(n2_rules)) < 1:
         # this condition isn't explicitly mentioned in Collins and Duffy (2001),
@@ -102,7 +169,8 @@ def common_subtrees(tree1, tree2, n1, n2, node_attrib='label'):
             assert len(n1_children) == len(n2_children)
             result = 1  # neutral element of multiplication
             for j, n1_child_node in enumerate(n1_children):
-                result *= 1 + common_subtrees(tree1, tree2, n1_child_node, n2_children[j])
+                result *= 1 + _common_subtrees(tree1, tree2, n1_child_node,
+                                               n2_children[j], index1, index2)
             return result
 
 
@@ -110,44 +178,365 @@ def tree_kernel_polynomial(tree1, tree2, node_attrib='label'):
     """
     \sum_{n_1 \in N_1} \sum_{n_2 \in N_2} C(n_1, n_2)
     """
+    index1 = get_production_index(tree1, node_attrib=node_attrib)
+    index2 = get_production_index(tree2, node_attrib=node_attrib)
     common_sts = 0
     for tree1_node in tree1.nodes_iter():
         for tree2_node in tree2.nodes_iter():
-            common_sts += common_subtrees(tree1, tree2, tree1_node, tree2_node, node_attrib=node_attrib)
+            common_sts += _common_subtrees(tree1, tree2, tree1_node, tree2_node,
+                                           index1, index2)
     return common_sts
 
 
+def fast_tree_kernel(tree1, tree2, node_attrib='label'):
+    """
+    calculates the tree kernel of Collins and Duffy (2001) with the Fast
+    Tree Kernel algorithm of Moschitti (2006). Making Tree Kernels
+    practical for Natural Language Learning::
+
+        \sum_{n_1 \in N_1} \sum_{n_2 \in N_2} C(n_1, n_2)
+
+    The internal nodes of each tree are sorted by their production once.
+    Merging the two sorted lists yields all node pairs with identical
+    productions, which are the only pairs with a non-zero C(n1, n2).
+    These pairs are processed bottom-up (in post-order of the first tree),
+    so that C can be calculated from the memoized C values of the
+    children::
+
+        C(n_1, n_2) = \prod_{j} (1 + C(ch(n_1, j), ch(n_2, j)))
+
+    Parameters
+    ----------
+    tree1, tree2 : networkx.DiGraph or CompactTree
+        two trees represented as directed graphs (or as compact trees built
+        with the same vocabulary)
+    node_attrib : str or None
+        If a node attribute is given (e.g. 'label'), its value is used for
+        generating the production rules. Otherwise, the node IDs are used.
+        (Only used for converting networkx.DiGraph trees.)
+
+    Returns
+    -------
+    kernel : int
+        the number of common tree fragments
+    """
+    tree1, tree2 = as_compact_trees([tree1, tree2], node_attrib=node_attrib)
+    node_pairs = get_matching_node_pairs(tree1, tree2)
+    postorder_rank = numpy.empty(len(tree1.labels), dtype=int)
+    postorder_rank[tree1.postorder] = numpy.arange(len(tree1.labels))
+    node_pairs.sort(key=lambda (n1, n2): postorder_rank[n1])
+
+    children1, children2 = get_children_lists(tree1), get_children_lists(tree2)
+    common = {}  # C(n1, n2) of all node pairs with identical productions
+    for n1, n2 in node_pairs:
+        result = 1  # neutral element of multiplication
+        for n1_child, n2_child in zip(children1[n1], children2[n2]):
+            result *= 1 + common.get((n1_child, n2_child), 0)
+        common[(n1, n2)] = result
+    return sum(common.itervalues())
+
+
+def get_matching_node_pairs(tree1, tree2):
+    """
+    returns all (tree1 node, tree2 node) pairs of internal nodes that share
+    the same production, by sorting the nodes of each tree by their
+    production and merging the two sorted lists (Moschitti 2006).
+
+    Parameters
+    ----------
+    tree1, tree2 : CompactTree
+        two trees, built with the same vocabulary
+
+    Returns
+    -------
+    node_pairs : list of (int, int) tuples
+    """
+    if tree1.vocabulary is not tree2.vocabulary:
+        raise ValueError("The trees were built with different vocabularies")
+    nodes1 = _nodes_sorted_by_production(tree1)
+    nodes2 = _nodes_sorted_by_production(tree2)
+    productions1 = tree1.productions[nodes1].tolist()
+    productions2 = tree2.productions[nodes2].tolist()
+    nodes1, nodes2 = nodes1.tolist(), nodes2.tolist()
+
+    node_pairs = []
+    i, j = 0, 0
+    while i < len(nodes1) and j < len(nodes2):
+        production = productions1[i]
+        if production < productions2[j]:
+            i += 1
+        elif production > productions2[j]:
+            j += 1
+        else:  # collect all nodes with this production from both trees
+            i_end, j_end = i, j
+            while i_end < len(nodes1) and productions1[i_end] == production:
+                i_end += 1
+            while j_end < len(nodes2) and productions2[j_end] == production:
+                j_end += 1
+            node_pairs.extend(itertools.product(nodes1[i:i_end], nodes2[j:j_end]))
+            i, j = i_end, j_end
+    return node_pairs
+
+
+def _nodes_sorted_by_production(compact_tree):
+    """returns the internal nodes of a CompactTree, sorted by production."""
+    nodes = numpy.argsort(compact_tree.productions, kind='mergesort')
+    return nodes[compact_tree.productions[nodes] >= 0]
+
+
+def decayed_tree_kernel(tree1, tree2, lambda_weight=1, sigma=1,
+                        node_attrib='label'):
+    """
+    calculates the decayed subset tree (SST, sigma=1) or subtree (ST,
+    sigma=0) kernel of Moschitti (2006). Efficient Convolution Kernels for
+    Dependency and Constituent Syntactic Trees::
+
+        \sum_{n_1 \in N_1} \sum_{n_2 \in N_2} \Delta(n_1, n_2)
+
+        \Delta(n_1, n_2) = \lambda \prod_{j} (\sigma + \Delta(ch(n_1, j), ch(n_2, j)))
+
+    \Delta(n_1, n_2) is 0 if the productions of n1 and n2 differ. Pairs of
+    leaf children contribute a factor of 1, so that \Delta is lambda for
+    two matching preterminals. With lambda_weight=1 and sigma=1, this is
+    the same as fast_tree_kernel().
+
+    The \Delta values of all node pairs are stored in a |N1| x |N2| matrix,
+    which is filled row by row (in post-order of the first tree). Each row
+    is calculated for all nodes of the second tree at once, using a
+    production equality mask and the child offsets of the second tree.
+
+    Parameters
+    ----------
+    tree1, tree2 : networkx.DiGraph or CompactTree
+        two trees represented as directed graphs (or as compact trees built
+        with the same vocabulary)
+    lambda_weight : int or float
+        decay factor (0 < lambda <= 1), which downweights larger fragments
+    sigma : int
+        1 for the subset tree kernel, 0 for the subtree kernel
+    node_attrib : str or None
+        If a node attribute is given (e.g. 'label'), its value is used for
+        generating the production rules. Otherwise, the node IDs are used.
+        (Only used for converting networkx.DiGraph trees.)
+
+    Returns
+    -------
+    kernel : float
+    """
+    tree1, tree2 = as_compact_trees([tree1, tree2], node_attrib=node_attrib)
+    is_leaf1, is_leaf2 = tree1.productions < 0, tree2.productions < 0
+    delta = numpy.zeros((len(tree1.labels), len(tree2.labels)))
+
+    for n1 in tree1.postorder.tolist():
+        production = tree1.productions[n1]
+        if production < 0:
+            continue
+        n2s = numpy.flatnonzero(tree2.productions == production)
+        if not len(n2s):
+            continue
+        row = numpy.full(len(n2s), float(lambda_weight))
+        n2_offsets = tree2.child_offsets[n2s]
+        for j, n1_child in enumerate(get_children(tree1, n1).tolist()):
+            n2_children = tree2.children[n2_offsets + j]
+            # a pair of leaves contributes a factor of 1
+            row *= numpy.where(is_leaf1[n1_child] & is_leaf2[n2_children], 1,
+                               sigma + delta[n1_child, n2_children])
+        delta[n1, n2s] = row
+    return delta.sum()
+
+
 def tree_kernel_naive(tree1, tree2, node_attrib='label'):
     """
     \sum_{n_1 \in N_1} \sum_{n_2 \in N_2} \sum_i I_i(n_1) I_i(n_2)
     """
     all_subtrees = generate_all_unique_subtrees(tree1, tree2)
+    index1, index2 = get_production_index(tree1), get_production_index(tree2)
+    subtree_indexes = [get_production_index(subtree) for subtree in all_subtrees]
     common_sts = 0
     for tree1_node in tree1.nodes_iter():
         for tree2_node in tree2.nodes_iter():
-            for subtree in all_subtrees:
-                common_sts += is_rooted_at_node(tree1, subtree, tree1_node) * is_rooted_at_node(tree2, subtree, tree2_node)
+            for subtree, subtree_index in zip(all_subtrees, subtree_indexes):
+                common_sts += \
+                    _is_rooted_at_node(tree1, subtree, tree1_node, index1, subtree_index) * \
+                    _is_rooted_at_node(tree2, subtree, tree2_node, index2, subtree_index)
     return common_sts
 
 
-def find_all_common_subtrees_bruteforce(tree1, tree2, node_attrib=None):
+def find_all_common_subtrees_bruteforce(tree1, tree2, node_attrib='label'):
     """
     returns a list of all valid subtrees (Collins and Duffy 2001)
     that occur in both given trees.
     
     two subtrees are considered equal, iff they have the same structure
-    and their node labels are identical.
+    and their node labels (or node IDs, if node_attrib is None) are
+    identical.
     """
-    same_node_label = iso.categorical_node_match('label', '')
-    tree1_subtrees = get_subtrees(tree1, node_attrib=node_attrib)
-    tree2_subtrees = get_subtrees(tree2, node_attrib=node_attrib)
+    tree2_signatures = Counter(fragment_signature(subtree, node_attrib=node_attrib)
+                               for subtree in get_tree_fragments(tree2))
     common_subtrees = []
-    for (subtree1, subtree2) in itertools.product(tree1_subtrees, tree2_subtrees):
-        if nx.is_isomorphic(subtree1, subtree2, node_match=same_node_label):
-            common_subtrees.append(subtree1)
+    for subtree1 in get_tree_fragments(tree1):
+        signature = fragment_signature(subtree1, node_attrib=node_attrib)
+        common_subtrees.extend([subtree1] * tree2_signatures[signature])
     return common_subtrees
 
 
+def tree_fragment_vectorize(trees, min_support=1, max_size=None,
+                            node_attrib='label'):
+    """
+    maps a corpus of trees to a sparse matrix of their explicit tree
+    fragment features, i.e. each row contains the number of nodes of a tree
+    at which each fragment is rooted (h_i(T) in Collins and Duffy 2001).
+    Without pruning, the inner product of two rows is the fast_tree_kernel()
+    of the two corresponding trees.
+
+    The fragments are mined level-wise (Apriori-style): a fragment of depth
+    d+1 is only generated from the frequent fragments of depth <= d rooted
+    at the children of its root node. Since a fragment can't occur in more
+    trees than its parts, this only prunes infrequent fragments. Each pass
+    only generates the fragments of the next depth, i.e. the fragments in
+    which at least one child of the root node uses a fragment found in the
+    previous pass.
+
+    Parameters
+    ----------
+    trees : iterable of networkx.DiGraph
+        the trees to vectorize
+    min_support : int
+        the minimum number of trees that a fragment must occur in
+    max_size : int or None
+        the maximum number of nodes of a fragment
+    node_attrib : str or None
+        If a node attribute is given (e.g. 'label'), its value is used as the
+        node label. Otherwise, the node IDs are used.
+
+    Returns
+    -------
+    features : scipy.sparse.csr_matrix
+        a tree x fragment matrix
+    vocabulary : dict
+        maps fragment signatures (cf. fragment_signature()) to column indices
+        of the feature matrix
+    """
+    trees = list(trees)
+    tree_labels = []
+    for tree in trees:
+        if node_attrib:
+            tree_labels.append({node: escape_label(tree.node[node][node_attrib])
+                                for node in tree.nodes_iter()})
+        else:
+            tree_labels.append({node: escape_label(node)
+                                for node in tree.nodes_iter()})
+
+    tree_children = [{node: sorted(tree.successors(node))
+                      for node in tree.nodes_iter()} for tree in trees]
+
+    # maps each node of each tree to the frequent fragments rooted at it
+    # (i.e. a list of (signature, size) tuples), which were found before
+    # the last pass
+    tree_fragments = [defaultdict(list) for _ in trees]
+    # maps each node of each tree to the frequent fragments of the greatest
+    # depth rooted at it, which were found in the last pass
+    new_fragments = [{} for _ in trees]
+    first_pass = True
+    while True:
+        candidates = []
+        document_frequency = Counter()
+        for labels, children, fragments, new in zip(
+                tree_labels, tree_children, tree_fragments, new_fragments):
+            tree_candidates = {}
+            for node, node_children in children.iteritems():
+                if not node_children:
+                    continue
+                if first_pass:
+                    # only the productions of all internal nodes are counted
+                    old_options = [[] for _child in node_children]
+                    new_options = [[(labels[child], 1)]
+                                   for child in node_children]
+                elif not (node in fragments or node in new) or \
+                        not any(child in new for child in node_children):
+                    # the production is infrequent or there are no new
+                    # fragments to extend this node's fragments with
+                    continue
+                else:
+                    old_options = [[(labels[child], 1)] + fragments[child]
+                                   for child in node_children]
+                    new_options = [new.get(child, []) for child in node_children]
+                tree_candidates[node] = _fragment_candidates(
+                    labels[node], old_options, new_options, max_size)
+            candidates.append(tree_candidates)
+            document_frequency.update(set(
+                signature for node_candidates in tree_candidates.itervalues()
+                for signature, _size in node_candidates))
+
+        for i, tree_candidates in enumerate(candidates):
+            for node, node_fragments in new_fragments[i].iteritems():
+                tree_fragments[i][node].extend(node_fragments)
+            new_fragments[i] = {}
+            for node, node_candidates in tree_candidates.iteritems():
+                frequent = [(signature, size)
+                            for signature, size in node_candidates
+                            if document_frequency[signature] >= min_support]
+                if frequent:
+                    new_fragments[i][node] = frequent
+
+        first_pass = False
+        if not any(new_fragments):
+            break  # there are no frequent fragments with a greater depth
+
+    vocabulary = {}
+    indptr, indices, data = [0], [], []
+    for fragments in tree_fragments:
+        fragment_counts = Counter(
+            signature for node_fragments in fragments.itervalues()
+            for signature, _size in node_fragments)
+        for signature, count in fragment_counts.iteritems():
+            indices.append(vocabulary.setdefault(signature, len(vocabulary)))
+            data.append(count)
+        indptr.append(len(indices))
+
+    features = csr_matrix((data, indices, indptr),
+                          shape=(len(indptr)-1, len(vocabulary)))
+    return features, vocabulary
+
+
+def _fragment_candidates(label, old_options, new_options, max_size):
+    """
+    returns all fragments (as (signature, size) tuples) that consist of a
+    node's production and one option (i.e. the child's label or a frequent
+    fragment rooted at it) for each of its children, where at least one
+    child uses one of its new options. Each fragment is generated once,
+    as the children before the first child with a new option only use
+    their old options.
+
+    Parameters
+    ----------
+    label : unicode
+        the (escaped) label of the node
+    old_options, new_options : list of list of (unicode, int) tuples
+        the old and new (signature, size) options of each child
+    max_size : int or None
+        the maximum number of nodes of a fragment
+    """
+    def extend(combinations, options):
+        return [(signatures + (signature,), size + option_size)
+                for signatures, size in combinations
+                for signature, option_size in options
+                if max_size is None or size + option_size <= max_size]
+
+    combinations = []
+    prefixes = [((), 1)]  # combinations of old options only
+    for child_index, child_new_options in enumerate(new_options):
+        if child_new_options:
+            child_combinations = extend(prefixes, child_new_options)
+            for old, new in zip(old_options[child_index+1:],
+                                new_options[child_index+1:]):
+                child_combinations = extend(child_combinations, old + new)
+            combinations.extend(child_combinations)
+        prefixes = extend(prefixes, old_options[child_index])
+    return [(u'({} {})'.format(label, u' '.join(signatures)), size)
+            for signatures, size in combinations]
+
+
 def is_preterminal(tree, node):
     """
     returns True, if the given node is a preterminal in the given tree.
@@ -223,6 +612,106 @@ def get_production_rules(syntax_tree, root_node=None, node_attrib=None):
     return rules
 
 
+def get_production_index(syntax_tree, node_attrib=None):
+    """
+    returns the (cached) production index of the given tree, which stores
+    the production of each node and the set of productions of the subtree
+    rooted at each node (i.e. the result of get_production_rules() for each
+    node of the tree).
+
+    The index is built in one post-order traversal of the tree. It is
+    rebuilt automatically if the nodes or edges of the tree were changed
+    (which is checked against a snapshot of the node and edge sets, so
+    functions using the index should only call this once). If you change
+    the node attributes of a tree in-place, call invalidate_production_index().
+
+    Parameters
+    ----------
+    syntax_tree : networkx.DiGraph
+        a tree represented as a directed graph
+    node_attrib : str or None
+        If a node attribute is given (e.g. 'label'), its value is used for
+        generating the production rules. Otherwise, the node IDs are used.
+
+    Returns
+    -------
+    index : ProductionIndex
+        a (fingerprint, root, productions, subtree_productions) named tuple.
+        ``productions`` maps each internal node to its production rule,
+        ``subtree_productions`` maps each node to a frozenset of production
+        rules.
+    """
+    fingerprint = _tree_fingerprint(syntax_tree)
+    tree_indexes = _PRODUCTION_INDEXES.setdefault(syntax_tree, {})
+    index = tree_indexes.get(node_attrib)
+    if index is None or index.fingerprint != fingerprint:
+        index = _build_production_index(syntax_tree, fingerprint,
+                                        node_attrib=node_attrib)
+        tree_indexes[node_attrib] = index
+    return index
+
+
+def invalidate_production_index(syntax_tree):
+    """removes the cached production index(es) of the given tree."""
+    _PRODUCTION_INDEXES.pop(syntax_tree, None)
+
+
+def get_subtree_productions(syntax_tree, root_node=None, node_attrib=None):
+    """
+    returns the same production rules as get_production_rules(), but as a
+    frozenset that is looked up in the tree's production index.
+    """
+    return _subtree_productions(
+        get_production_index(syntax_tree, node_attrib=node_attrib),
+        root_node=root_node)
+
+
+def _subtree_productions(index, root_node=None):
+    """
+    returns the production rules of the subtree rooted at the given node
+    (or at the root node) from a production index.
+    """
+    if not root_node:
+        root_node = index.root
+    return index.subtree_productions[root_node]
+
+
+def _tree_fingerprint(syntax_tree):
+    """
+    returns a snapshot of the nodes and edges of a tree, which is used to
+    detect if a tree was mutated after its production index was built.
+    """
+    return (frozenset(syntax_tree.nodes_iter()),
+            frozenset(syntax_tree.edges_iter()))
+
+
+def _build_production_index(syntax_tree, fingerprint, node_attrib=None):
+    """builds a ProductionIndex in one post-order traversal of the tree."""
+    if node_attrib:
+        get_label = lambda node: syntax_tree.node[node][node_attrib]
+    else:  # rules will be generated from node IDs
+        get_label = lambda node: node
+
+    productions = {}
+    subtree_productions = {}
+    for node in nx.dfs_postorder_nodes(syntax_tree):
+        children = sorted(syntax_tree.successors(node))
+        if children:
+            production = (get_label(node),
+                          tuple(get_label(child) for child in children))
+            productions[node] = production
+            rules = set([production])
+            for child in children:
+                rules.update(subtree_productions[child])
+            subtree_productions[node] = frozenset(rules)
+        else:
+            subtree_productions[node] = frozenset()
+
+    # root node is the first element in a topological sort of the graph
+    root = topological_sort(syntax_tree)[0] if len(syntax_tree) else None
+    return ProductionIndex(fingerprint, root, productions, subtree_productions)
+
+
 def contains_only_complete_productions(tree, subtree, subtree_root_node=None,
                                        node_attrib=None):
     """
@@ -242,10 +731,10 @@ def contains_only_complete_productions(tree, subtree, subtree_root_node=None,
         If a node attribute is given (e.g. 'label'), its value is used for
         generating the production rules. Otherwise, the node IDs are used.
     """
-    tree_rules = get_production_rules(tree, node_attrib=node_attrib)
-    subtree_rules = get_production_rules(subtree, root_node=subtree_root_node,
-                                         node_attrib=node_attrib)
-    return all(st_rule in tree_rules for st_rule in subtree_rules)
+    tree_rules = get_subtree_productions(tree, node_attrib=node_attrib)
+    subtree_rules = get_subtree_productions(subtree, root_node=subtree_root_node,
+                                            node_attrib=node_attrib)
+    return subtree_rules <= tree_rules
 
 
 
@@ -325,7 +814,7 @@ def get_subtrees(tree, node_attrib=None):
 
     See further
     -----------
-    is_treefragment()
+    is_treefragment(), get_tree_fragments()
     """
     for n in xrange(1, tree.number_of_nodes()+1):
         for sub_nodes in itertools.combinations(tree.nodes(), n):
@@ -334,6 +823,84 @@ def get_subtrees(tree, node_attrib=None):
                 yield subgraph
 
 
+def get_tree_fragments(tree, root_node=None, max_depth=None, max_size=None):
+    """
+    generates all subtrees (tree fragments) of a given tree, which are valid
+    according to Collins and Duffy (2001), i.e. all fragments that consist
+    of complete productions.
+
+    Instead of testing all combinations of nodes (like get_subtrees()), the
+    fragments are grown from their root node: for each child of a fragment,
+    we either stop (the child becomes a leaf of the fragment) or add the
+    child's complete production. Therefore, each fragment is generated
+    exactly once.
+
+    Parameters
+    ----------
+    tree : networkx.DiGraph
+        a tree represented as a digraph
+    root_node : node ID or None
+        If given, only the fragments rooted at this node are generated.
+        Otherwise, the fragments rooted at all (internal) nodes are generated.
+    max_depth : int or None
+        the maximum depth (number of production levels) of a fragment
+    max_size : int or None
+        the maximum number of nodes of a fragment
+
+    Yields
+    ------
+    subtrees : generator of networkx.DiGraph
+    """
+    if root_node is None:
+        root_nodes = sorted(node for node in tree.nodes_iter()
+                            if not is_leave(tree, node))
+    else:
+        root_nodes = [root_node]
+
+    budget = None if max_size is None else max_size - 1
+    for root in root_nodes:
+        for descendants in _fragment_expansions(tree, root, max_depth, budget):
+            yield tree.subgraph([root] + descendants)
+
+
+def _fragment_expansions(tree, node, max_depth, budget):
+    """
+    yields the nodes below the given node for each fragment that contains
+    the complete production of the node (with at most ``max_depth``
+    production levels and ``budget`` nodes below the given node).
+    """
+    children = sorted(tree.successors(node))
+    if not children or max_depth is not None and max_depth < 1:
+        return
+    if budget is not None:
+        if len(children) > budget:
+            return
+        budget -= len(children)
+
+    child_depth = None if max_depth is None else max_depth - 1
+    for descendants in _expand_children(tree, children, child_depth, budget):
+        yield children + descendants
+
+
+def _expand_children(tree, children, max_depth, budget):
+    """
+    yields all combinations of expanding (or not expanding) each of the
+    given children.
+    """
+    if not children:
+        yield []
+        return
+
+    first_child, other_children = children[0], children[1:]
+    first_expansions = itertools.chain(
+        [[]], _fragment_expansions(tree, first_child, max_depth, budget))
+    for first_descendants in first_expansions:
+        other_budget = None if budget is None else budget - len(first_descendants)
+        for other_descendants in _expand_children(tree, other_children,
+                                                  max_depth, other_budget):
+            yield first_descendants + other_descendants
+
+
 def is_treefragment(tree, tree_fragment, node_attrib=None):
     """
     returns True, iff the given tree fragment is a valid subtree
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursekernels.programming@arne.cl>
+
+"""
+An inverted index from production rules to the trees of a corpus, which
+is used to find the k trees with the highest tree kernel value for a query
+tree without evaluating the kernel for all trees of the corpus.
+"""
+
+from collections import defaultdict
+import heapq
+
+from compact_tree import as_compact_tree, get_children_lists
+from tree import fast_tree_kernel
+
+
+class TreeIndex(object):
+    """
+    maps each production to the trees that contain it. For each tree, we
+    store how often the production occurs in it (c_T(p)) and the sum of
+    the number of fragments rooted at these nodes (D_T(p)).
+
+    As the number of common fragments rooted at two nodes (C(n1, n2)) can't
+    be greater than the number of fragments rooted at either node, the
+    fast_tree_kernel() of a query tree q and a tree T is bounded by::
+
+        \sum_p \min(D_q(p) c_T(p), c_q(p) D_T(p))
+
+    A query only considers the trees that share at least one production
+    with the query tree and evaluates the kernel in the order of
+    decreasing upper bounds, until no remaining tree can beat the k-th
+    best result.
+    """
+    def __init__(self, trees=None, node_attrib='label', vocabulary=None):
+        """
+        Parameters
+        ----------
+        trees : iterable of networkx.DiGraph or CompactTree or None
+            the trees to index
+        node_attrib : str or None
+            If a node attribute is given (e.g. 'label'), its value is used for
+            generating the production rules. Otherwise, the node IDs are used.
+            (Only used for converting networkx.DiGraph trees.)
+        vocabulary : TreeVocabulary or None
+            used for interning labels and productions. If not given, the
+            vocabulary of the first CompactTree added to the index (or
+            compact_tree.DEFAULT_VOCABULARY) is used.
+        """
+        self.node_attrib = node_attrib
+        self.vocabulary = vocabulary
+        self.trees = []
+        # maps each production ID to a list of (tree ID, c_T(p), D_T(p))
+        self.postings = defaultdict(list)
+        if trees is not None:
+            for tree in trees:
+                self.add(tree)
+
+    def __len__(self):
+        return len(self.trees)
+
+    def add(self, tree):
+        """adds a tree to the index and returns its tree ID."""
+        tree = as_compact_tree(tree, node_attrib=self.node_attrib,
+                               vocabulary=self.vocabulary)
+        # all trees added later must use the same vocabulary
+        self.vocabulary = tree.vocabulary
+        tree_id = len(self.trees)
+        self.trees.append(tree)
+        for production, (count, dsum) in production_statistics(tree).iteritems():
+            self.postings[production].append((tree_id, count, dsum))
+        return tree_id
+
+    def upper_bounds(self, tree):
+        """
+        returns a dict that maps the ID of each indexed tree that shares at
+        least one production with the given tree to an upper bound of their
+        fast_tree_kernel().
+        """
+        tree = as_compact_tree(tree, node_attrib=self.node_attrib,
+                               vocabulary=self.vocabulary)
+        bounds = defaultdict(int)
+        for production, (query_count, query_dsum) in \
+                production_statistics(tree).iteritems():
+            for tree_id, count, dsum in self.postings.get(production, ()):
+                bounds[tree_id] += min(query_dsum * count, query_count * dsum)
+        return bounds
+
+    def query(self, tree, k=10):
+        """
+        returns the k indexed trees with the highest fast_tree_kernel()
+        value for the given tree.
+
+        Returns
+        -------
+        results : list of (int, int) tuples
+            (kernel value, tree ID) tuples, sorted by decreasing kernel value.
+            Trees without any common fragments are never returned.
+        """
+        if k < 1:
+            return []
+        tree = as_compact_tree(tree, node_attrib=self.node_attrib,
+                               vocabulary=self.vocabulary)
+        bounds = self.upper_bounds(tree)
+        candidates = sorted(bounds, key=bounds.get, reverse=True)
+
+        best = []  # min-heap of the k best (kernel value, tree ID) tuples
+        for tree_id in candidates:
+            if len(best) == k and bounds[tree_id] <= best[0][0]:
+                break  # no remaining tree can beat the k-th best result
+            kernel = fast_tree_kernel(tree, self.trees[tree_id])
+            if len(best) < k:
+                heapq.heappush(best, (kernel, tree_id))
+            elif kernel > best[0][0]:
+                heapq.heapreplace(best, (kernel, tree_id))
+        return sorted(best, key=lambda (kernel, tree_id): (-kernel, tree_id))
+
+
+def count_rooted_fragments(compact_tree):
+    """
+    returns the number of tree fragments rooted at each node of a
+    CompactTree (D(n) = 0 for leaves, otherwise \prod_j (1 + D(ch(n, j)))).
+    """
+    children = get_children_lists(compact_tree)
+    fragment_counts = [0] * len(children)
+    for node in compact_tree.postorder.tolist():
+        if children[node]:
+            result = 1
+            for child in children[node]:
+                result *= 1 + fragment_counts[child]
+            fragment_counts[node] = result
+    return fragment_counts
+
+
+def production_statistics(compact_tree):
+    """
+    returns a dict that maps each production ID of a CompactTree to a
+    (number of nodes with this production, sum of D(n) of these nodes)
+    tuple.
+    """
+    fragment_counts = count_rooted_fragments(compact_tree)
+    statistics = {}
+    for node, production in enumerate(compact_tree.productions.tolist()):
+        if production >= 0:
+            count, dsum = statistics.get(production, (0, 0))
+            statistics[production] = (count + 1, dsum + fragment_counts[node])
+    return statistics
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Author: Arne Neumann <discoursekernels.programming@arne.cl>
+
+"""
+A streaming reader for bracketed (Penn Treebank style) syntax trees, e.g.::
+
+    ( (S (NP (NNP Jeff)) (VP (VBD ate) (NP (NNS cookies)))) )
+
+The trees are read one at a time (from plain, gzip or bzip2 compressed
+files) and converted directly into CompactTrees, so that a whole treebank
+can be processed by the tree kernels without building a networkx graph
+for each sentence.
+"""
+
+import re
+
+from compact_tree import make_compact_tree
+from util import open_corpus
+
+
+TOKEN_REGEX = re.compile(r'\(|\)|[^\s()]+')
+
+
+def read_treebank(path, vocabulary=None, remove_empty_root=True):
+    """
+    reads all bracketed trees from a (plain, .gz or .bz2 compressed) file.
+
+    Yields
+    ------
+    tree : CompactTree
+        one tree after the other (cf. read_bracketed_trees())
+    """
+    with open_corpus(path) as corpus_file:
+        for tree in read_bracketed_trees(corpus_file, vocabulary=vocabulary,
+                                         remove_empty_root=remove_empty_root):
+            yield tree
+
+
+def read_bracketed_trees(lines, vocabulary=None, remove_empty_root=True):
+    """
+    parses bracketed trees from an iterable of lines (e.g. an open file).
+    A tree may span several lines and a line may contain several trees.
+    Only the tree that is currently parsed is kept in memory.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        the lines of a bracketed treebank
+    vocabulary : TreeVocabulary or None
+        used for interning labels and productions. If not given,
+        compact_tree.DEFAULT_VOCABULARY is used.
+    remove_empty_root : bool
+        If True, the unlabeled root node that wraps each tree in the Penn
+        Treebank (e.g. ``( (S ...) )``) is removed.
+
+    Yields
+    ------
+    tree : CompactTree
+        one tree after the other. The nodes are numbered in pre-order, i.e.
+        node 0 is the root node.
+    """
+    labels, children, stack = [], [], []
+    expects_label = False
+    for line_number, line in enumerate(lines, 1):
+        for token in TOKEN_REGEX.findall(line):
+            if token == '(':
+                if expects_label:  # the parent node has no label
+                    labels[stack[-1]] = ''
+                node = len(labels)
+                labels.append(None)
+                children.append([])
+                if stack:
+                    children[stack[-1]].append(node)
+                stack.append(node)
+                expects_label = True
+            elif token == ')':
+                if not stack:
+                    raise ValueError(
+                        "Unbalanced ')' in line {}".format(line_number))
+                if expects_label:  # the node has no label
+                    labels[stack[-1]] = ''
+                    expects_label = False
+                stack.pop()
+                if not stack:
+                    yield _make_tree(labels, children, vocabulary,
+                                     remove_empty_root)
+                    labels, children = [], []
+            elif expects_label:
+                labels[stack[-1]] = token
+                expects_label = False
+            else:  # a leaf node (i.e. a word)
+                if not stack:
+                    raise ValueError(
+                        "Token '{}' outside of a tree in line {}".format(
+                            token, line_number))
+                children[stack[-1]].append(len(labels))
+                labels.append(token)
+                children.append([])
+    if stack:
+        raise ValueError("Unbalanced '(' at the end of the treebank")
+
+
+def _make_tree(labels, children, vocabulary, remove_empty_root):
+    """
+    converts the pre-order node labels and children of a parsed tree into a
+    CompactTree (optionally removing the empty root node).
+    """
+    if remove_empty_root and labels[0] == '' and len(children[0]) == 1:
+        labels = labels[1:]
+        children = [[child-1 for child in node_children]
+                    for node_children in children[1:]]
+    return make_compact_tree(labels, children, vocabulary=vocabulary)
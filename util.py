@@ -2,16 +2,11 @@
 # -*- coding: utf-8 -*-
 # Author: Arne Neumann <discoursekernels.programming@arne.cl>
 
+import bz2
+import gzip
 from inspect import getsource
-from pygments import highlight
-from pygments.lexers import PythonLexer
-from pygments.formatters import HtmlFormatter
 
-from IPython.core.display import HTML
-from IPython.display import display, Image
-
-# install with: sudo pip install git+http://github.com/chebee7i/nxpd/#egg=nxpd
-from nxpd import draw
+import numpy
 
 
 def memoize(f):
@@ -36,6 +31,38 @@ def memoize(f):
     return memodict(f)
 
 
+def open_corpus(path):
+    """
+    opens a (plain, .gz or .bz2 compressed) corpus file for reading.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    elif path.endswith('.bz2'):
+        return bz2.BZ2File(path, 'rb')
+    return open(path, 'rb')
+
+
+def read_only_array(values):
+    """converts a list of integers into a read-only numpy array."""
+    array = numpy.array(values, dtype=numpy.int32)
+    array.flags.writeable = False
+    return array
+
+
+def escape_label(label):
+    """
+    escapes brackets, spaces and backslashes in a node label and returns it
+    as a unicode string (byte strings are decoded as UTF-8).
+    """
+    if isinstance(label, str):
+        label = label.decode('utf-8')
+    elif not isinstance(label, unicode):
+        label = unicode(label)
+    for char in u'\\() ':
+        label = label.replace(char, u'\\' + char)
+    return label
+
+
 def label_nodes(node_label_tuples_list):
     """
     convert a list of (node ID, node label) tuples into a list of
@@ -65,6 +92,10 @@ def draw_multiple_graphs(graphs):
     draws multiple networkx graphs with graphviz and put the generated
     images in the same IPython notebook output cell.
     """
+    from IPython.display import display, Image
+    # install with: sudo pip install git+http://github.com/chebee7i/nxpd/#egg=nxpd
+    from nxpd import draw
+
     for graph in graphs:
         display(Image(filename=draw(graph, show=False)))
 
@@ -76,5 +107,10 @@ def print_source(function):
     
     # cf. http://stackoverflow.com/q/20665118
     """
+    from IPython.core.display import HTML
+    from pygments import highlight
+    from pygments.lexers import PythonLexer
+    from pygments.formatters import HtmlFormatter
+
     return HTML(highlight(getsource(function), PythonLexer(), 
                 HtmlFormatter(full=True, nobackground=True)))